@@ -7,6 +7,7 @@ import shortuuid
 import yaml
 from capellambse import MelodyModel
 
+from arcadiaMergeTool.helpers.idcache import updateNamespaces
 from arcadiaMergeTool.helpers.types import ModelElement_co
 
 
@@ -49,6 +50,6 @@ def create_element(model: MelodyModel, parent, source: ModelElement_co) -> Model
         child = pel.makeelement(el.tag, nsmap=el.nsmap, attrib=attrib)
         child.set("id", obj_id)
         pel.append(child)
-        model._loader.update_namespaces()
+        updateNamespaces(model._loader)
         model._loader.idcache_index(child)
     return m.wrap_xml(model, child)
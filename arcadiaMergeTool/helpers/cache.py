@@ -0,0 +1,356 @@
+"""Caches of loaded model files."""
+
+import collections
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from collections.abc import Callable, Iterable, Iterator
+
+import capellambse
+from capellambse.loader import core
+from lxml import etree
+
+from arcadiaMergeTool import getLogger
+from arcadiaMergeTool.helpers.idcache import INDEX_LAYOUT_KNOWN
+
+LOGGER = getLogger(__name__)
+
+_FORMAT_VERSION = 2
+
+_CHUNK_SIZE = 1 << 20
+
+_activeCache: contextvars.ContextVar["ModelFileCache | None"] = contextvars.ContextVar("_activeCache", default=None)
+_activeLibraries: contextvars.ContextVar["LibraryRegistry | None"] = contextvars.ContextVar("_activeLibraries", default=None)
+_installLock = threading.Lock()
+_installed = 0
+_originalModelFile: type[core.ModelFile] = core.ModelFile
+
+type _IndexEntry = tuple[int, str | None, str | None, tuple[str, ...], str | None]
+
+class ModelFileCache:
+    """Directory of cached model file indexes.
+
+    Parameters
+    ----------
+    path:
+        Cache directory, created on first use
+
+    Description
+    -----------
+    Loader of a model file parses the file and indexes every element by
+    uuid and type. Index is kept on disk as JSON by the file content,
+    capellambse and lxml versions. Element is referred by its position in
+    the document order, which is the same for every parse of the same
+    content. Cached index replaces indexing, parsing is still done, lxml
+    trees cannot be restored other way. Only files of local directories
+    are cached.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    def keyOf(self, path: pathlib.Path) -> str:
+        """Make cache key of the file.
+
+        Parameters
+        ----------
+        path:
+            Local path of the file
+
+        Returns
+        -------
+        Hex digest of the file content and versions
+        """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{_FORMAT_VERSION}\x00{capellambse.__version__}\x00{etree.__version__}\x00".encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def load(self, key: str) -> list[_IndexEntry] | None:
+        """Load cached index.
+
+        Parameters
+        ----------
+        key:
+            Cache key of the file
+
+        Returns
+        -------
+        Index entries, None if not cached or unreadable
+        """
+        try:
+            with open(os.path.join(self.path, f"{key}.json"), "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            LOGGER.warning("[%s] Cached index is unreadable, key [%s], [%r]", self.load.__qualname__, key, e)
+            return None
+
+    def dump(self, key: str, entries: list[_IndexEntry]):
+        """Record index into the cache.
+
+        Parameters
+        ----------
+        key:
+            Cache key of the file
+        entries:
+            Index entries
+        """
+        # concurrent loaders may write the same key, replace is atomic
+        (fd, tmp) = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f, separators=(",", ":"))
+        os.replace(tmp, os.path.join(self.path, f"{key}.json"))
+
+type _LibraryKey = tuple[str, str, bool]
+
+class LibraryRegistry:
+    """Library files loaded once and shared by several models.
+
+    Parameters
+    ----------
+    roots:
+        Local directories of the libraries to share
+
+    Description
+    -----------
+    Model file found under one of the roots is loaded by the first model
+    asking for it, other models get the same file. Shared files must not
+    be modified, models loaded with the registry are read-only. Files of
+    remote libraries are not shared.
+    """
+
+    def __init__(self, roots: Iterable[str]):
+        self._roots = {os.path.realpath(root) for root in roots}
+        self._files: dict[_LibraryKey, core.ModelFile] = {}
+        self._locks: dict[_LibraryKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.loaded = 0
+        self.shared = 0
+
+    def keyOf(self, filename: pathlib.PurePosixPath, handler, ignoreUuidDups: bool) -> _LibraryKey | None:
+        """Make registry key of the file.
+
+        Parameters
+        ----------
+        filename:
+            Name of the file within the file handler
+        handler:
+            File handler of the resource
+        ignoreUuidDups:
+            Loader flag, files loaded with other flag are not shared
+
+        Returns
+        -------
+        Key of the shared file, None if file is not a library file
+        """
+        path = getattr(handler, "path", None)
+        if not isinstance(path, pathlib.Path):
+            return None
+        root = os.path.realpath(path)
+        if root not in self._roots:
+            return None
+        return (root, str(filename), ignoreUuidDups)
+
+    def share(self, key: _LibraryKey, load: Callable[[], core.ModelFile]) -> core.ModelFile:
+        """Get shared file, loading it on first request.
+
+        Parameters
+        ----------
+        key:
+            Registry key of the file
+        load:
+            Loader of the file
+
+        Returns
+        -------
+        Loaded file
+        """
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        # concurrent models wait for the first one to load the file
+        with lock:
+            file = self._files.get(key)
+            if file is None:
+                file = self._files[key] = load()
+                self.loaded += 1
+            else:
+                self.shared += 1
+        return file
+
+class _CachedModelFile(core.ModelFile):
+    """Model file restoring its index from the active cache and shared by the active registry."""
+
+    __ready = False
+
+    def __new__(cls, filename, handler, *, ignore_uuid_dups: bool):
+        libraries = _activeLibraries.get()
+        key = libraries.keyOf(filename, handler, ignore_uuid_dups) if libraries is not None else None
+        if key is None:
+            return super().__new__(cls)
+
+        def load():
+            file = super(_CachedModelFile, cls).__new__(cls)
+            file.__init__(filename, handler, ignore_uuid_dups=ignore_uuid_dups)
+            return file
+
+        return libraries.share(key, load)
+
+    def __init__(self, filename, handler, *, ignore_uuid_dups: bool):
+        if self.__ready:
+            # shared file is already loaded
+            return
+
+        self.__cache = _activeCache.get()
+        try:
+            super().__init__(filename, handler, ignore_uuid_dups=ignore_uuid_dups)
+        finally:
+            # later rebuilds index the modified tree
+            self.__cache = None
+        self.__ready = True
+
+    def idcache_rebuild(self) -> None:
+        cache = self.__cache
+        path = getattr(self.filehandler, "path", None)
+        if cache is None or not INDEX_LAYOUT_KNOWN or not isinstance(path, pathlib.Path):
+            # index layout of other capellambse versions is unknown, remote files have no stable key
+            super().idcache_rebuild()
+            return
+
+        key = cache.keyOf(path / self.filename)
+
+        elements = list(self.root.iter())
+        entries = cache.load(key)
+        if entries is not None and self.__restore(elements, entries):
+            cache.hits += 1
+            return
+
+        cache.misses += 1
+        super().idcache_rebuild()
+        cache.dump(key, self.__entries(elements))
+
+    def __restore(self, elements: list[etree._Element], entries: list[_IndexEntry]) -> bool:
+        qtypes: collections.defaultdict[etree.QName, dict[int, etree._Element]] = collections.defaultdict(dict)
+        xtypes: collections.defaultdict[str, dict[int, etree._Element]] = collections.defaultdict(dict)
+        ids: dict[str, etree._Element] = {}
+        hrefs: dict[str, etree._Element] = {}
+        names: dict[str, etree.QName] = {}
+
+        for (pos, xtype, qtype, elmIds, href) in entries:
+            if pos >= len(elements):
+                return False
+            elm = elements[pos]
+            if xtype is not None:
+                xtypes[xtype][id(elm)] = elm
+            if qtype is not None:
+                name = names.get(qtype)
+                if name is None:
+                    name = names[qtype] = etree.QName(qtype)
+                qtypes[name][id(elm)] = elm
+            for elmId in elmIds:
+                ids[elmId] = elm
+            if href is not None:
+                hrefs[href] = elm
+
+        self._ModelFile__qtypecache = qtypes
+        self._ModelFile__xtypecache = xtypes
+        self._ModelFile__idcache = ids
+        self._ModelFile__hrefsources = hrefs
+        return True
+
+    def __entries(self, elements: list[etree._Element]) -> list[_IndexEntry]:
+        positions = {id(elm): pos for (pos, elm) in enumerate(elements)}
+        records: dict[int, list] = {}
+
+        def record(elm: etree._Element) -> list:
+            pos = positions[id(elm)]
+            entry = records.get(pos)
+            if entry is None:
+                entry = records[pos] = [pos, None, None, [], None]
+            return entry
+
+        for (xtype, elms) in self._ModelFile__xtypecache.items():
+            for elm in elms.values():
+                record(elm)[1] = xtype
+        for (qtype, elms) in self._ModelFile__qtypecache.items():
+            for elm in elms.values():
+                record(elm)[2] = qtype.text
+        for (elmId, elm) in self._ModelFile__idcache.items():
+            record(elm)[3].append(elmId)
+        for (href, elm) in self._ModelFile__hrefsources.items():
+            record(elm)[4] = href
+
+        return [(pos, xtype, qtype, tuple(elmIds), href) for (pos, xtype, qtype, elmIds, href) in sorted(records.values())]
+
+def _install():
+    global _installed, _originalModelFile
+
+    with _installLock:
+        if _installed == 0:
+            # loader looks the class up in its module on every file
+            _originalModelFile = core.ModelFile
+            core.ModelFile = _CachedModelFile
+        _installed += 1
+
+def _uninstall():
+    global _installed
+
+    with _installLock:
+        _installed -= 1
+        if _installed == 0:
+            # outermost context is left, files are loaded as usual again
+            core.ModelFile = _originalModelFile
+
+@contextlib.contextmanager
+def sharedLibraries(libraries: LibraryRegistry | None) -> Iterator[None]:
+    """Share library files loaded within the context.
+
+    Parameters
+    ----------
+    libraries:
+        Registry to share files with, None to load files as usual
+    """
+    if libraries is None:
+        yield
+        return
+
+    _install()
+    token = _activeLibraries.set(libraries)
+    try:
+        yield
+    finally:
+        _activeLibraries.reset(token)
+        _uninstall()
+
+@contextlib.contextmanager
+def modelFileCache(cache: ModelFileCache | None) -> Iterator[None]:
+    """Use the cache for model files loaded within the context.
+
+    Parameters
+    ----------
+    cache:
+        Cache to use, None to load files as usual
+    """
+    if cache is None:
+        yield
+        return
+
+    _install()
+    token = _activeCache.set(cache)
+    try:
+        yield
+    finally:
+        _activeCache.reset(token)
+        _uninstall()
@@ -0,0 +1,103 @@
+"""Content fingerprints of model elements."""
+
+import hashlib
+
+from capellambse import helpers
+from capellambse.loader import MelodyLoader
+from lxml import etree
+
+
+def _feed(h: "hashlib.blake2b", el: etree._Element):
+    if not isinstance(el.tag, str):
+        # comments and processing instructions do not carry model content
+        return
+
+    h.update(el.tag.encode())
+    for k, v in sorted(el.attrib.items()):
+        h.update(b"\x00")
+        h.update(str(k).encode())
+        h.update(b"=")
+        h.update(str(v).encode())
+    h.update(b"\x01")
+    if el.text is not None and el.text.strip():
+        h.update(el.text.encode())
+    h.update(b"\x02")
+
+def fingerprint(el: etree._Element) -> str:
+    """Make fingerprint of the element own content.
+
+    Parameters
+    ----------
+    el:
+        XML element of the model element
+
+    Returns
+    -------
+    Hex digest of the element attributes and references
+
+    Description
+    -----------
+    Fingerprint covers element attributes, including references stored in
+    attributes, and nested nodes without own id, like reference links and
+    text bodies. Nested model elements have their own fingerprints.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _feed(h, el)
+
+    stack = [child for child in reversed(el) if child.get("id") is None]
+    while stack:
+        node = stack.pop()
+        _feed(h, node)
+        h.update(b"\x03")
+        stack.extend(child for child in reversed(node) if child.get("id") is None)
+
+    return h.hexdigest()
+
+def _parentId(el: etree._Element) -> str | None:
+    parent = el.getparent()
+    return parent.get("id") if parent is not None else None
+
+class AncestorIndex:
+    """Elements of the common ancestor model by uuid and fingerprint.
+
+    Parameters
+    ----------
+    loader:
+        Loader of the ancestor model
+
+    Description
+    -----------
+    Index covers elements of the model own fragments, elements of linked
+    libraries are left out. Element is known unchanged when the ancestor
+    has element with the same uuid, class, parent and fingerprint.
+    """
+
+    def __init__(self, loader: MelodyLoader):
+        self._entries: dict[str, tuple[str, str | None, str]] = {}
+        for (fragment, tree) in loader.trees.items():
+            if fragment.parts[0] != "\x00":
+                continue
+            for el in tree.root.iter():
+                uuid = el.get("id") if isinstance(el.tag, str) else None
+                if uuid is not None:
+                    self._entries[uuid] = (helpers.xtype_of(el) or el.tag, _parentId(el), fingerprint(el))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def unchanged(self, el: etree._Element) -> bool:
+        """Check if element is the same as in the ancestor.
+
+        Parameters
+        ----------
+        el:
+            XML element of the model element
+
+        Returns
+        -------
+        True if ancestor has the same element, False otherwise
+        """
+        entry = self._entries.get(el.get("id", ""))
+        if entry is None:
+            return False
+        return entry == (helpers.xtype_of(el) or el.tag, _parentId(el), fingerprint(el))
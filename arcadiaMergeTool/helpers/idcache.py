@@ -0,0 +1,192 @@
+"""Maintenance of the model loader id cache.
+
+Loader keeps every fragment indexed by element id, type and href. Model
+changes keep the index current
+1. Created elements are indexed by capellambse on creation, or by
+   ``create_element`` for elements copied as XML
+2. Removed elements are dropped from the index by ``removeElement``
+3. Namespace update, either explicit or by capellambse on creation of
+   element of a new namespace, moves fragment content under the new root
+   element, ``syncRoots`` indexes the new root in place of the old one
+
+Index is therefore not rebuilt on save, ``verifyIdCache`` compares it with
+the index rebuilt from scratch. Private index fields of ``ModelFile`` are
+used for capellambse versions with known index layout only, the index is
+rebuilt otherwise.
+"""
+
+import capellambse
+from capellambse import helpers
+from capellambse.loader import core
+from lxml import etree
+
+from arcadiaMergeTool import getLogger
+
+LOGGER = getLogger(__name__)
+
+_INDEX_VERSIONS = ("0.8.",)
+"""capellambse versions with the known layout of the ModelFile index"""
+
+_INDEX_FIELDS = frozenset({
+    "_ModelFile__idcache",
+    "_ModelFile__xtypecache",
+    "_ModelFile__qtypecache",
+    "_ModelFile__hrefsources",
+})
+
+INDEX_LAYOUT_KNOWN = (
+    capellambse.__version__.startswith(_INDEX_VERSIONS)
+    and _INDEX_FIELDS.issubset(core.ModelFile.__annotations__)
+)
+"""Private index fields of ModelFile can be used, public rebuild is used otherwise"""
+
+def _indexRoot(tree: core.ModelFile, root: etree._Element):
+    # same as ModelFile.idcache_index, but for the root element only
+    xtype = helpers.xtype_of(root)
+    if xtype is not None:
+        tree._ModelFile__xtypecache[xtype][id(root)] = root
+    qtype = helpers.qtype_of(root)
+    if qtype is not None:
+        tree._ModelFile__qtypecache[qtype][id(root)] = root
+    for idtype in core.IDTYPES_PER_FILETYPE[tree.filename.suffix]:
+        elmId = root.get(idtype)
+        if elmId is not None:
+            tree._ModelFile__idcache[elmId] = root
+    href = root.get("href")
+    if href is not None:
+        tree._ModelFile__hrefsources[href.split("#")[-1]] = root
+
+def fragmentRoot(el: etree._Element) -> etree._Element:
+    """Get the topmost ancestor of the element.
+
+    Parameters
+    ----------
+    el:
+        XML element of the model
+
+    Returns
+    -------
+    Root element of the fragment, replaced root is not a document root yet
+    """
+    root = el
+    while (parent := root.getparent()) is not None:
+        root = parent
+    return root
+
+def syncRoots(loader: core.MelodyLoader):
+    """Index replaced fragment roots in place of the old ones.
+
+    Parameters
+    ----------
+    loader:
+        Loader of the model
+
+    Description
+    -----------
+    Whole index is rebuilt when index layout of capellambse is unknown.
+    """
+    if not INDEX_LAYOUT_KNOWN:
+        loader.idcache_rebuild()
+        return
+
+    for tree in loader.trees.values():
+        root = tree.root
+        qtype = helpers.qtype_of(root)
+        indexed = tree._ModelFile__qtypecache.get(qtype, {})
+        if id(root) in indexed:
+            continue
+
+        # old root is left without children, only its own entries are dropped
+        for old in [elm for elm in indexed.values() if elm.getparent() is None]:
+            tree.idcache_remove(old)
+        _indexRoot(tree, root)
+
+def updateNamespaces(loader: core.MelodyLoader):
+    """Update namespace definitions of the fragments keeping the index current.
+
+    Parameters
+    ----------
+    loader:
+        Loader of the model
+    """
+    loader.update_namespaces()
+    syncRoots(loader)
+
+def removeElement(loader: core.MelodyLoader, el: etree._Element):
+    """Remove element and its subtree from the model.
+
+    Parameters
+    ----------
+    loader:
+        Loader of the model
+    el:
+        XML element to remove
+    """
+    loader.idcache_remove(el)
+    el.getparent().remove(el) # pyright: ignore[reportOptionalMemberAccess] expect model element has parent
+
+def _snapshot(tree: core.ModelFile) -> tuple[dict, dict, dict, dict]:
+    # snapshot holds the elements, lxml keeps the same proxies for them
+    def byType(cache: dict) -> dict:
+        return {str(k): dict(v) for (k, v) in cache.items() if len(v) > 0}
+
+    return (
+        dict(tree._ModelFile__idcache),
+        byType(tree._ModelFile__xtypecache),
+        byType(tree._ModelFile__qtypecache),
+        dict(tree._ModelFile__hrefsources),
+    )
+
+def _differs(kept: dict, rebuilt: dict) -> list[str]:
+    diff = []
+    for k in kept.keys() | rebuilt.keys():
+        (a, b) = (kept.get(k), rebuilt.get(k))
+        if isinstance(a, dict) and isinstance(b, dict):
+            if a.keys() != b.keys():
+                diff.append(k)
+        elif a is not b:
+            diff.append(k)
+    return diff
+
+def verifyIdCache(loader: core.MelodyLoader) -> bool:
+    """Compare the index with the index rebuilt from scratch.
+
+    Parameters
+    ----------
+    loader:
+        Loader of the model
+
+    Returns
+    -------
+    True if index is consistent, False otherwise
+
+    Description
+    -----------
+    Index is left rebuilt, inconsistencies are logged. Index is only
+    rebuilt when index layout of capellambse is unknown.
+    """
+    if not INDEX_LAYOUT_KNOWN:
+        LOGGER.warning("[%s] Index layout of capellambse [%s] is unknown, id cache is rebuilt without check", verifyIdCache.__qualname__, capellambse.__version__)
+        loader.idcache_rebuild()
+        return True
+
+    consistent = True
+    for (fragment, tree) in loader.trees.items():
+        before = _snapshot(tree)
+        tree.idcache_rebuild()
+        after = _snapshot(tree)
+
+        for (name, kept, rebuilt) in zip(("ids", "xtypes", "qtypes", "hrefs"), before, after, strict=True):
+            diff = _differs(kept, rebuilt)
+            if len(diff) > 0:
+                consistent = False
+                LOGGER.error(
+                    "[%s] Id cache is inconsistent, fragment [%s], index [%s], keys [%s]: [%s]",
+                    verifyIdCache.__qualname__,
+                    fragment,
+                    name,
+                    len(diff),
+                    sorted(diff)[:10],
+                )
+
+    return consistent
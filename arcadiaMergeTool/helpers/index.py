@@ -0,0 +1,526 @@
+"""Indexes of destination model collections."""
+
+import abc
+import bisect
+import heapq
+from collections.abc import Callable
+
+from capellambse.model import ElementList, ModelElement
+
+type CollectionKey = tuple[
+    str,  # owner element uuid
+    str,  # collection attribute name
+]
+
+def collectionKey(coll: ElementList) -> CollectionKey | None:
+    """Make index key of the collection.
+
+    Parameters
+    ----------
+    coll:
+        Collection to make key for
+
+    Returns
+    -------
+    Owner uuid and attribute name, None for collections not bound to the owner
+    """
+    owner = getattr(coll, "_parent", None)
+    if not isinstance(owner, ModelElement):
+        return None
+
+    for cls in type(coll).__mro__:
+        accessor = cls.__dict__.get("_accessor")
+        if accessor is not None:
+            return (owner.uuid, getattr(accessor, "__name__", cls.__name__))
+
+    return None
+
+class CollectionIndex[K](abc.ABC):
+    """Index of destination collection elements by the element key.
+
+    Description
+    -----------
+    Collection is indexed on the first lookup and kept up to date by the
+    merger for elements it clones. Elements added to the collection by
+    other means change collection size, index of such collection is built
+    again on the next lookup. Elements found are checked to have the key
+    still, element changed in place, e.g. renamed, makes the index of its
+    collection built again. Changes making elements match the key they did
+    not match before are not seen, such collection is to be invalidated.
+    """
+
+    def __init__(self):
+        self._index: dict[CollectionKey, tuple[int, dict[K, list[ModelElement]]]] = {}
+
+    @abc.abstractmethod
+    def keyOf(self, y: ModelElement) -> K:
+        """Make index key of the element."""
+
+    def _build(self, key: CollectionKey, coll: ElementList) -> dict[K, list[ModelElement]]:
+        keys: dict[K, list[ModelElement]] = {}
+        for y in coll:
+            keys.setdefault(self.keyOf(y), []).append(y)
+        self._index[key] = (len(coll), keys)
+        return keys
+
+    def find(self, coll: ElementList, k: K) -> list[ModelElement]:
+        """Find collection elements by key.
+
+        Parameters
+        ----------
+        coll:
+            Collection to search in
+        k:
+            Element key to look for
+
+        Returns
+        -------
+        Elements with the key in collection order
+        """
+        key = collectionKey(coll)
+        if key is None:
+            return [y for y in coll if self.keyOf(y) == k]
+
+        entry = self._index.get(key)
+        if entry is None or entry[0] != len(coll):
+            return list(self._build(key, coll).get(k, ()))
+
+        found = entry[1].get(k, ())
+        if any(self.keyOf(y) != k for y in found):
+            # element is changed since the collection is indexed
+            found = self._build(key, coll).get(k, ())
+        return list(found)
+
+    def invalidate(self, coll: ElementList):
+        """Drop index of the collection, e.g. after its element is renamed.
+
+        Parameters
+        ----------
+        coll:
+            Collection with changed elements
+        """
+        key = collectionKey(coll)
+        if key is not None:
+            self._index.pop(key, None)
+
+    def add(self, coll: ElementList, y: ModelElement):
+        """Record element added to the collection.
+
+        Parameters
+        ----------
+        coll:
+            Collection element is added to
+        y:
+            Added element
+        """
+        key = collectionKey(coll)
+        entry = self._index.get(key) if key is not None else None
+        if entry is None:
+            return
+
+        (size, keys) = entry
+        keys.setdefault(self.keyOf(y), []).append(y)
+        self._index[key] = (size + 1, keys) # pyright: ignore[reportArgumentType] key is checked above
+
+class NameIndex(CollectionIndex[str]):
+    """Index of destination collection elements by name."""
+
+    def keyOf(self, y: ModelElement) -> str:
+        return y.name
+
+type Endpoints = tuple[
+    str | None,  # source uuid
+    str | None,  # target uuid
+]
+
+class EndpointIndex(CollectionIndex[Endpoints]):
+    """Index of destination relationships by their ends.
+
+    Parameters
+    ----------
+    sourceAttr:
+        Attribute holding relationship source
+    targetAttr:
+        Attribute holding relationship target
+    """
+
+    def __init__(self, sourceAttr: str, targetAttr: str):
+        super().__init__()
+        self.sourceAttr = sourceAttr
+        self.targetAttr = targetAttr
+
+    def keyOf(self, y: ModelElement) -> Endpoints:
+        source = getattr(y, self.sourceAttr, None)
+        target = getattr(y, self.targetAttr, None)
+        return (
+            source.uuid if isinstance(source, ModelElement) else None,
+            target.uuid if isinstance(target, ModelElement) else None,
+        )
+
+class _Adjacency:
+    """Ports of the collection by connected exchanges."""
+
+    def __init__(self):
+        self.ports: list[ModelElement] = []
+        self.positions: dict[str, int] = {}
+        self.exchanges: dict[str, list[int]] = {}
+        self.sources: dict[str, list[int]] = {}
+        self.targets: dict[str, list[int]] = {}
+        self.unconnected: dict[str, list[int]] = {}
+
+def _insert[K](table: dict[K, list[int]], key: K, pos: int):
+    positions = table.setdefault(key, [])
+    i = bisect.bisect_left(positions, pos)
+    if i == len(positions) or positions[i] != pos:
+        positions.insert(i, pos)
+
+def _remove[K](table: dict[K, list[int]], key: K, pos: int):
+    positions = table.get(key)
+    if positions is not None and pos in positions:
+        positions.remove(pos)
+
+class AdjacencyIndex:
+    """Index of destination ports by exchanges connected to them.
+
+    Parameters
+    ----------
+    exchangesAttr:
+        Port attribute holding connected exchanges
+
+    Description
+    -----------
+    Port collection is indexed on the first lookup by the names of
+    connected exchanges, names of their source and target ends, and names
+    of ports without exchanges. Merger reports ports it adds and exchange
+    ends it assigns, collection which size does not match the index is
+    indexed again on the next lookup.
+    """
+
+    def __init__(self, exchangesAttr: str):
+        self.exchangesAttr = exchangesAttr
+        self._index: dict[CollectionKey, tuple[int, _Adjacency]] = {}
+        self._portCollection: dict[str, CollectionKey] = {}
+
+    def _link(self, entry: _Adjacency, pos: int, ex: ModelElement):
+        port = entry.ports[pos]
+        _remove(entry.unconnected, port.name, pos)
+        _insert(entry.exchanges, ex.name, pos)
+
+        source = getattr(ex, "source", None)
+        if source is not None:
+            _insert(entry.sources, source.name, pos)
+        target = getattr(ex, "target", None)
+        if target is not None:
+            _insert(entry.targets, target.name, pos)
+
+    def _append(self, key: CollectionKey, entry: _Adjacency, port: ModelElement):
+        pos = len(entry.ports)
+        entry.ports.append(port)
+        entry.positions[port.uuid] = pos
+        self._portCollection[port.uuid] = key
+
+        exchanges = getattr(port, self.exchangesAttr)
+        if len(exchanges) == 0:
+            _insert(entry.unconnected, port.name, pos)
+        for ex in exchanges:
+            self._link(entry, pos, ex)
+
+    def _entry(self, coll: ElementList) -> _Adjacency | None:
+        key = collectionKey(coll)
+        if key is None:
+            return None
+
+        indexed = self._index.get(key)
+        if indexed is not None and indexed[0] == len(coll):
+            return indexed[1]
+
+        entry = _Adjacency()
+        for port in coll:
+            self._append(key, entry, port)
+        self._index[key] = (len(coll), entry)
+        return entry
+
+    def findUnconnected(self, coll: ElementList, name: str) -> ModelElement | None:
+        """Find first port without exchanges.
+
+        Parameters
+        ----------
+        coll:
+            Port collection to search in
+        name:
+            Port name
+
+        Returns
+        -------
+        Matching port or None
+        """
+        entry = self._entry(coll)
+        if entry is None:
+            for port in coll:
+                if len(getattr(port, self.exchangesAttr)) == 0 and port.name == name:
+                    return port
+            return None
+
+        positions = entry.unconnected.get(name)
+        return entry.ports[positions[0]] if positions else None
+
+    def findConnected(
+        self,
+        coll: ElementList,
+        exchangeName: str,
+        sourceName: str | None = None,
+        targetName: str | None = None,
+        accept: Callable[[ModelElement], bool] | None = None,
+    ) -> ModelElement | None:
+        """Find first port connected to the matching exchange.
+
+        Parameters
+        ----------
+        coll:
+            Port collection to search in
+        exchangeName:
+            Name of connected exchange
+        sourceName:
+            Name of connected exchange source end, if any
+        targetName:
+            Name of connected exchange target end, if any
+        accept:
+            Extra check of port candidate
+
+        Returns
+        -------
+        First port in collection order having any of matching exchanges
+        """
+        entry = self._entry(coll)
+        if entry is None:
+            for port in coll:
+                for ex in getattr(port, self.exchangesAttr):
+                    if ((ex.name == exchangeName
+                        or (sourceName is not None and ex.source is not None and ex.source.name == sourceName)
+                        or (targetName is not None and ex.target is not None and ex.target.name == targetName))
+                        and (accept is None or accept(port))):
+                        return port
+            return None
+
+        candidates = [entry.exchanges.get(exchangeName, [])]
+        if sourceName is not None:
+            candidates.append(entry.sources.get(sourceName, []))
+        if targetName is not None:
+            candidates.append(entry.targets.get(targetName, []))
+
+        for pos in heapq.merge(*candidates):
+            port = entry.ports[pos]
+            if accept is None or accept(port):
+                return port
+
+        return None
+
+    def add(self, coll: ElementList, port: ModelElement):
+        """Record port added to the collection.
+
+        Parameters
+        ----------
+        coll:
+            Collection port is added to
+        port:
+            Added port
+        """
+        key = collectionKey(coll)
+        indexed = self._index.get(key) if key is not None else None
+        if indexed is None:
+            return
+
+        (size, entry) = indexed
+        self._append(key, entry, port) # pyright: ignore[reportArgumentType] key is checked above
+        self._index[key] = (size + 1, entry) # pyright: ignore[reportArgumentType] key is checked above
+
+    def connect(self, ex: ModelElement):
+        """Record assigned exchange end.
+
+        Parameters
+        ----------
+        ex:
+            Exchange with the new end, both of its ends are updated
+        """
+        for port in (getattr(ex, "source", None), getattr(ex, "target", None)):
+            if port is None:
+                continue
+            key = self._portCollection.get(port.uuid)
+            indexed = self._index.get(key) if key is not None else None
+            if indexed is not None:
+                entry = indexed[1]
+                self._link(entry, entry.positions[port.uuid], ex)
+
+type Triplet = tuple[
+    str,  # exchange name
+    str,  # source end owner uuid
+    str,  # target end owner uuid
+]
+
+class _Exchanges:
+    """Exchanges of the collection by name and owners of their ends."""
+
+    def __init__(self):
+        self.items: list[ModelElement] = []
+        self.positions: dict[str, int] = {}
+        self.connected: dict[Triplet, list[int]] = {}
+        self.pending: dict[str, list[int]] = {}
+
+class ExchangeIndex:
+    """Index of destination exchanges by name and owners of their ends.
+
+    Parameters
+    ----------
+    sourceAttr:
+        Attribute holding exchange source end
+    targetAttr:
+        Attribute holding exchange target end
+    anyEndPending:
+        Exchange missing any of its ends is pending, by default only
+        exchange missing both ends is
+    endNamed:
+        Exchange is named after its source end rather than by itself
+
+    Description
+    -----------
+    Connected exchanges are indexed by the triplet of name, source end
+    owner and target end owner, pending exchanges are indexed by name.
+    Exchange ends are assigned after exchange lands into the model, so
+    merger reports both added exchanges and assigned ends.
+    """
+
+    def __init__(self, sourceAttr: str, targetAttr: str, anyEndPending: bool, endNamed: bool):
+        self.sourceAttr = sourceAttr
+        self.targetAttr = targetAttr
+        self.anyEndPending = anyEndPending
+        self.endNamed = endNamed
+        self._index: dict[CollectionKey, tuple[int, _Exchanges]] = {}
+        self._exchangeCollection: dict[str, CollectionKey] = {}
+
+    def nameOf(self, y: ModelElement) -> str | None:
+        """Get name exchange is matched by."""
+        if self.endNamed:
+            end = getattr(y, self.sourceAttr, None)
+            return end.name if end is not None else None
+
+        return y.name
+
+    def _classify(self, entry: _Exchanges, pos: int):
+        y = entry.items[pos]
+        name = self.nameOf(y)
+        if name is None:
+            return
+
+        source = getattr(y, self.sourceAttr, None)
+        target = getattr(y, self.targetAttr, None)
+
+        if source is None or target is None:
+            if self.anyEndPending or (source is None and target is None):
+                _insert(entry.pending, name, pos)
+            else:
+                _remove(entry.pending, name, pos)
+            return
+
+        _remove(entry.pending, name, pos)
+        _insert(entry.connected, (name, source.parent.uuid, target.parent.uuid), pos)
+
+    def _append(self, key: CollectionKey | None, entry: _Exchanges, y: ModelElement):
+        pos = len(entry.items)
+        entry.items.append(y)
+        entry.positions[y.uuid] = pos
+        if key is not None:
+            self._exchangeCollection[y.uuid] = key
+
+        self._classify(entry, pos)
+
+    def _entry(self, coll: ElementList) -> _Exchanges:
+        key = collectionKey(coll)
+        indexed = self._index.get(key) if key is not None else None
+        if indexed is not None and indexed[0] == len(coll):
+            return indexed[1]
+
+        entry = _Exchanges()
+        for y in coll:
+            self._append(key, entry, y)
+        if key is not None:
+            self._index[key] = (len(coll), entry)
+        return entry
+
+    def pending(self, coll: ElementList, name: str) -> bool:
+        """Check if collection has pending exchange with the name.
+
+        Parameters
+        ----------
+        coll:
+            Exchange collection to search in
+        name:
+            Exchange name
+
+        Returns
+        -------
+        True if any exchange with the name misses its ends
+        """
+        return len(self._entry(coll).pending.get(name, ())) > 0
+
+    def find(
+        self,
+        coll: ElementList,
+        name: str,
+        sourceOwner: ModelElement | None,
+        targetOwner: ModelElement | None,
+    ) -> list[ModelElement]:
+        """Find connected exchanges by name and owners of their ends.
+
+        Parameters
+        ----------
+        coll:
+            Exchange collection to search in
+        name:
+            Exchange name
+        sourceOwner:
+            Destination owner of exchange source end
+        targetOwner:
+            Destination owner of exchange target end
+
+        Returns
+        -------
+        Matching exchanges in collection order
+        """
+        if sourceOwner is None or targetOwner is None:
+            return []
+
+        entry = self._entry(coll)
+        return [entry.items[pos] for pos in entry.connected.get((name, sourceOwner.uuid, targetOwner.uuid), ())]
+
+    def add(self, coll: ElementList, y: ModelElement):
+        """Record exchange added to the collection.
+
+        Parameters
+        ----------
+        coll:
+            Collection exchange is added to
+        y:
+            Added exchange
+        """
+        key = collectionKey(coll)
+        indexed = self._index.get(key) if key is not None else None
+        if indexed is None:
+            return
+
+        (size, entry) = indexed
+        self._append(key, entry, y)
+        self._index[key] = (size + 1, entry) # pyright: ignore[reportArgumentType] key is checked above
+
+    def connect(self, ex: ModelElement):
+        """Record assigned exchange end.
+
+        Parameters
+        ----------
+        ex:
+            Exchange with the new end
+        """
+        key = self._exchangeCollection.get(ex.uuid)
+        indexed = self._index.get(key) if key is not None else None
+        if indexed is not None:
+            entry = indexed[1]
+            self._classify(entry, entry.positions[ex.uuid])
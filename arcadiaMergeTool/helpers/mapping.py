@@ -0,0 +1,435 @@
+"""Mapping of source model elements to destination model elements."""
+
+import sys
+from collections.abc import Iterator, MutableMapping
+
+from capellambse import MelodyModel
+from capellambse.model import ElementList, ModelElement, wrap_xml
+from lxml import etree
+
+from arcadiaMergeTool.helpers.fingerprint import AncestorIndex
+from arcadiaMergeTool.helpers.index import (
+    AdjacencyIndex,
+    EndpointIndex,
+    ExchangeIndex,
+    NameIndex,
+)
+from arcadiaMergeTool.helpers.store import MappingStoreRow
+from arcadiaMergeTool.helpers.types import (
+    MergerElementMappingEntry,
+    MergerElementMappingKey,
+)
+
+
+class _MappedElement:
+    """Mapping record of the destination element."""
+
+    __slots__ = ("element", "fromLibrary", "model")
+
+    def __init__(self, model: MelodyModel, element: etree._Element, fromLibrary: bool):
+        self.model = model
+        self.element = element
+        self.fromLibrary = fromLibrary
+
+class MergerElementMapping(MutableMapping[MergerElementMappingKey, MergerElementMappingEntry]):
+    """Element mapping with wait lists of postponed elements.
+
+    Description
+    -----------
+    Entries are grouped by interned source model uuid and keep XML element
+    of the destination element rather than its wrapper, the wrapper is made
+    on access. Destination element uuids are indexed back to the source
+    keys mapped on them.
+
+    Processors report mapping keys they are waiting on, merge loop parks
+    postponed element on those keys. Record of any key into the mapping
+    wakes up elements parked on it.
+
+    Elements found postponed are remembered with the mapping generation,
+    every record into the mapping starts a new generation. Repeated
+    processing of such element within the same generation is skipped.
+
+    Destination elements created by cloning are remembered with the source
+    element they are cloned from, until any other source element matches
+    them. Children of such element coming from the same source parent have
+    nothing to match against in the destination.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._entries: dict[str, dict[str, _MappedElement]] = {}
+        self._sources: dict[str, list[MergerElementMappingKey]] = {}
+        self._size = 0
+        self._awaited: list[MergerElementMappingKey] = []
+        self._waiters: dict[MergerElementMappingKey, list[MergerElementMappingKey]] = {}
+        self._woken: list[MergerElementMappingKey] = []
+        self._generation = 0
+        self._postponed: dict[MergerElementMappingKey, tuple[int, list[MergerElementMappingKey]]] = {}
+        self._created: dict[str, MergerElementMappingKey] = {}
+        self._createdNames: dict[str, set[str]] = {}
+        self._cloned: set[str] = set()
+        self.names = NameIndex()
+        """Destination collections by element name"""
+        self._endpoints: dict[tuple[str, str], EndpointIndex] = {}
+        self._adjacency: dict[str, AdjacencyIndex] = {}
+        self._exchanges: dict[tuple[str, str, bool, bool], ExchangeIndex] = {}
+        self._ancestors: dict[str, AncestorIndex] = {}
+        self.update(*args, **kwargs)
+
+    def _record(self, key: MergerElementMappingKey) -> _MappedElement | None:
+        entries = self._entries.get(key[0])
+        return entries.get(key[1]) if entries is not None else None
+
+    def __getitem__(self, key: MergerElementMappingKey) -> MergerElementMappingEntry:
+        record = self._record(key)
+        if record is None:
+            raise KeyError(key)
+        return (wrap_xml(record.model, record.element), record.fromLibrary)
+
+    def get(self, key: MergerElementMappingKey, default=None): # pyright: ignore[reportIncompatibleMethodOverride] same contract as dict.get
+        record = self._record(key)
+        if record is None:
+            return default
+        return (wrap_xml(record.model, record.element), record.fromLibrary)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, tuple) and self._record(key) is not None # pyright: ignore[reportArgumentType] key is checked to be tuple
+
+    def __iter__(self) -> Iterator[MergerElementMappingKey]:
+        for modelUuid, entries in self._entries.items():
+            for uuid in entries:
+                yield (modelUuid, uuid)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __setitem__(self, key: MergerElementMappingKey, value: MergerElementMappingEntry):
+        (element, fromLibrary) = value
+        modelUuid = sys.intern(key[0])
+        entries = self._entries.setdefault(modelUuid, {})
+        previous = entries.get(key[1])
+        if previous is None:
+            self._size += 1
+        else:
+            self._dropSource(previous, (modelUuid, key[1]))
+
+        entries[key[1]] = _MappedElement(element._model, element._element, fromLibrary)
+        self._sources.setdefault(element.uuid, []).append((modelUuid, key[1]))
+        self._generation += 1
+
+        waiters = self._waiters.pop(key, None)
+        if waiters is not None:
+            self._woken.extend(waiters)
+
+    def __delitem__(self, key: MergerElementMappingKey):
+        entries = self._entries.get(key[0])
+        record = entries.pop(key[1], None) if entries is not None else None
+        if record is None:
+            raise KeyError(key)
+
+        self._size -= 1
+        self._dropSource(record, key)
+
+    def _dropSource(self, record: _MappedElement, key: MergerElementMappingKey):
+        sources = self._sources.get(record.element.get("id", ""))
+        if sources is not None and key in sources:
+            sources.remove(key)
+
+    def sourcesOf(self, uuid: str) -> list[MergerElementMappingKey]:
+        """Get source elements mapped on the destination element.
+
+        Parameters
+        ----------
+        uuid:
+            Destination element uuid
+
+        Returns
+        -------
+        Mapping keys of source elements in the order of mapping
+        """
+        return list(self._sources.get(uuid, ()))
+
+    def rows(self) -> Iterator[MappingStoreRow]:
+        """Iterate over entries without wrapping destination elements.
+
+        Returns
+        -------
+        Iterator of store rows, without source fingerprints
+        """
+        for modelUuid, entries in self._entries.items():
+            for uuid, record in entries.items():
+                destUuid = record.element.get("id", "")
+                yield MappingStoreRow((modelUuid, uuid), destUuid, record.fromLibrary, destUuid in self._cloned)
+
+    def markCloned(self, uuid: str):
+        """Remember destination element as created by the merger.
+
+        Parameters
+        ----------
+        uuid:
+            Destination element uuid
+        """
+        self._cloned.add(uuid)
+
+    def awaitKeys(self, *keys: MergerElementMappingKey):
+        """Report keys current element is waiting on.
+
+        Parameters
+        ----------
+        keys:
+            Mapping keys blocking element processing
+        """
+        self._awaited.extend(keys)
+
+    def awaitedMark(self) -> int:
+        """Get position in the list of reported keys.
+
+        Returns
+        -------
+        Mark to pass to ``markPostponed``
+        """
+        return len(self._awaited)
+
+    def markPostponed(self, key: MergerElementMappingKey, mark: int):
+        """Remember element as postponed in the current generation.
+
+        Parameters
+        ----------
+        key:
+            Mapping key of the postponed element
+        mark:
+            Position of reported keys before element processing
+        """
+        self._postponed[key] = (self._generation, self._awaited[mark:])
+
+    def knownPostponed(self, key: MergerElementMappingKey) -> bool:
+        """Check if element is postponed in the current generation.
+
+        Parameters
+        ----------
+        key:
+            Mapping key of the element
+
+        Returns
+        -------
+        True if element is known as postponed, keys it waits on are reported
+        again in this case
+        """
+        entry = self._postponed.get(key)
+        if entry is None or entry[0] != self._generation:
+            return False
+
+        self._awaited.extend(entry[1])
+        return True
+
+    def forgetPostponed(self):
+        """Drop all known postponed elements."""
+        self._postponed.clear()
+
+    def endpoints(self, sourceAttr: str = "source", targetAttr: str = "target") -> EndpointIndex:
+        """Get index of destination relationships by their ends.
+
+        Parameters
+        ----------
+        sourceAttr:
+            Attribute holding relationship source
+        targetAttr:
+            Attribute holding relationship target
+
+        Returns
+        -------
+        Index for the pair of attributes
+        """
+        index = self._endpoints.get((sourceAttr, targetAttr))
+        if index is None:
+            index = EndpointIndex(sourceAttr, targetAttr)
+            self._endpoints[(sourceAttr, targetAttr)] = index
+        return index
+
+    def adjacency(self, exchangesAttr: str = "exchanges") -> AdjacencyIndex:
+        """Get index of destination ports by connected exchanges.
+
+        Parameters
+        ----------
+        exchangesAttr:
+            Port attribute holding connected exchanges
+
+        Returns
+        -------
+        Index for the port attribute
+        """
+        index = self._adjacency.get(exchangesAttr)
+        if index is None:
+            index = AdjacencyIndex(exchangesAttr)
+            self._adjacency[exchangesAttr] = index
+        return index
+
+    def exchanges(
+        self,
+        sourceAttr: str = "source",
+        targetAttr: str = "target",
+        anyEndPending: bool = False,
+        endNamed: bool = False,
+    ) -> ExchangeIndex:
+        """Get index of destination exchanges by name and owners of their ends.
+
+        Parameters
+        ----------
+        sourceAttr:
+            Attribute holding exchange source end
+        targetAttr:
+            Attribute holding exchange target end
+        anyEndPending:
+            Exchange missing any of its ends is pending
+        endNamed:
+            Exchange is named after its source end
+
+        Returns
+        -------
+        Index for the set of parameters
+        """
+        params = (sourceAttr, targetAttr, anyEndPending, endNamed)
+        index = self._exchanges.get(params)
+        if index is None:
+            index = ExchangeIndex(*params)
+            self._exchanges[params] = index
+        return index
+
+    def ancestors(self, base: MelodyModel) -> AncestorIndex:
+        """Get index of the common ancestor model elements.
+
+        Parameters
+        ----------
+        base:
+            Common ancestor model
+
+        Returns
+        -------
+        Index of the model, built on first use
+        """
+        index = self._ancestors.get(base.uuid)
+        if index is None:
+            index = AncestorIndex(base._loader)
+            self._ancestors[base.uuid] = index
+        return index
+
+    def recordAdded(self, coll: ElementList, y: ModelElement):
+        """Update collection indexes with cloned element.
+
+        Parameters
+        ----------
+        coll:
+            Collection element is added to
+        y:
+            Added element
+        """
+        self.names.add(coll, y)
+        for index in self._endpoints.values():
+            index.add(coll, y)
+        for adjacency in self._adjacency.values():
+            adjacency.add(coll, y)
+        for exchanges in self._exchanges.values():
+            exchanges.add(coll, y)
+
+    def recordConnected(self, ex: ModelElement):
+        """Update indexes with assigned exchange end.
+
+        Parameters
+        ----------
+        ex:
+            Exchange with the new end
+        """
+        for adjacency in self._adjacency.values():
+            adjacency.connect(ex)
+        for exchanges in self._exchanges.values():
+            exchanges.connect(ex)
+
+    def recordCreated(self, uuid: str, key: MergerElementMappingKey):
+        """Remember destination element created out of the source element.
+
+        Parameters
+        ----------
+        uuid:
+            Destination element uuid
+        key:
+            Mapping key of the source element
+        """
+        self._created[uuid] = key
+        self._cloned.add(uuid)
+
+    def dropCreated(self, uuid: str):
+        """Forget destination element matched by other source element.
+
+        Parameters
+        ----------
+        uuid:
+            Destination element uuid
+        """
+        if self._created.pop(uuid, None) is not None:
+            self._createdNames.pop(uuid, None)
+
+    def claimFreshName(self, uuid: str, key: MergerElementMappingKey, name: str) -> bool:
+        """Check if name is new under destination element created from the source.
+
+        Parameters
+        ----------
+        uuid:
+            Destination parent uuid
+        key:
+            Mapping key of the source parent
+        name:
+            Name of the child element
+
+        Returns
+        -------
+        True if parent is created from the source parent and no child with
+        the same name landed into it, the name is claimed in this case
+        """
+        if self._created.get(uuid) != key:
+            return False
+
+        names = self._createdNames.setdefault(uuid, set())
+        if name in names:
+            return False
+
+        names.add(name)
+        return True
+
+    def takeAwaited(self) -> list[MergerElementMappingKey]:
+        """Collect and reset keys reported since the last call.
+
+        Returns
+        -------
+        Unique keys not yet recorded in the mapping
+        """
+        keys = [k for k in dict.fromkeys(self._awaited) if k not in self]
+        self._awaited.clear()
+        return keys
+
+    def park(self, waiter: MergerElementMappingKey, keys: list[MergerElementMappingKey]):
+        """Put waiter on wait lists of the keys.
+
+        Parameters
+        ----------
+        waiter:
+            Mapping key of the postponed element
+        keys:
+            Keys to wait for, any of them wakes the waiter up
+        """
+        for key in keys:
+            self._waiters.setdefault(key, []).append(waiter)
+
+    def takeWoken(self) -> list[MergerElementMappingKey]:
+        """Collect and reset waiters woken since the last call.
+
+        Returns
+        -------
+        Waiters whose keys were recorded, might contain duplicates
+        """
+        woken = self._woken
+        self._woken = []
+        return woken
+
+    def clearWaiters(self):
+        """Drop all wait lists."""
+        self._waiters.clear()
+        self._woken.clear()
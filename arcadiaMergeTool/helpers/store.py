@@ -0,0 +1,151 @@
+"""Persistent storage of the element mapping between merge runs."""
+
+import sqlite3
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from arcadiaMergeTool.helpers.types import MergerElementMappingKey
+
+
+class MappingStoreRow(NamedTuple):
+    """Stored mapping entry."""
+
+    key: MergerElementMappingKey
+    """Source model and element uuid"""
+    destUuid: str
+    """Destination element uuid"""
+    fromLibrary: bool
+    """Came from library flag"""
+    created: bool = False
+    """Destination element is created by the merger"""
+    fingerprint: str | None = None
+    """Fingerprint of the source element"""
+
+class ProjectDigestRow(NamedTuple):
+    """Stored content digest of a merged project."""
+
+    path: str
+    """Project path as given in the configuration"""
+    digest: str
+    """Digest of the project files and revisions"""
+    modelUuid: str
+    """Uuid of the loaded model"""
+
+_SCHEMA_VERSION = 3
+
+_SCHEMA = ("""
+CREATE TABLE mapping (
+    model_uuid TEXT NOT NULL,
+    element_uuid TEXT NOT NULL,
+    dest_uuid TEXT NOT NULL,
+    from_library INTEGER NOT NULL,
+    created INTEGER NOT NULL,
+    fingerprint TEXT,
+    PRIMARY KEY (model_uuid, element_uuid)
+) WITHOUT ROWID
+""", """
+CREATE TABLE project (
+    path TEXT NOT NULL PRIMARY KEY,
+    digest TEXT NOT NULL,
+    model_uuid TEXT NOT NULL
+) WITHOUT ROWID
+""")
+
+class MappingStore:
+    """SQLite backed store of the element mapping.
+
+    Parameters
+    ----------
+    path:
+        Database file, created on first use
+
+    Description
+    -----------
+    Store keeps the mapping and project digests of the last merge run.
+    Rows are loaded at once at start-up and replaced at once at the end of
+    the merge, partial updates are not committed until ``commit`` is
+    called. Store of other schema version is dropped, it holds nothing but
+    a cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+
+        (version,) = self._db.execute("PRAGMA user_version").fetchone()
+        if version != _SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS mapping")
+            self._db.execute("DROP TABLE IF EXISTS project")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            self._db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._db.commit()
+
+    def load(self) -> list[MappingStoreRow]:
+        """Load all rows recorded by the previous run.
+
+        Returns
+        -------
+        Rows of the stored mapping
+        """
+        cursor = self._db.execute("SELECT model_uuid, element_uuid, dest_uuid, from_library, created, fingerprint FROM mapping")
+        return [
+            MappingStoreRow((modelUuid, uuid), destUuid, bool(fromLibrary), bool(created), fingerprint)
+            for (modelUuid, uuid, destUuid, fromLibrary, created, fingerprint) in cursor
+        ]
+
+    def update(self, rows: Iterable[MappingStoreRow]):
+        """Record rows, replacing rows with the same key.
+
+        Parameters
+        ----------
+        rows:
+            Rows to record
+        """
+        self._db.executemany(
+            "INSERT OR REPLACE INTO mapping (model_uuid, element_uuid, dest_uuid, from_library, created, fingerprint) VALUES (?, ?, ?, ?, ?, ?)",
+            ((row.key[0], row.key[1], row.destUuid, int(row.fromLibrary), int(row.created), row.fingerprint) for row in rows),
+        )
+
+    def replace(self, rows: Iterable[MappingStoreRow]):
+        """Drop all rows and record new ones.
+
+        Parameters
+        ----------
+        rows:
+            Rows of the new mapping
+        """
+        self._db.execute("DELETE FROM mapping")
+        self.update(rows)
+
+    def loadDigests(self) -> dict[str, ProjectDigestRow]:
+        """Load project digests recorded by the previous run.
+
+        Returns
+        -------
+        Digest rows by project path
+        """
+        cursor = self._db.execute("SELECT path, digest, model_uuid FROM project")
+        return {path: ProjectDigestRow(path, digest, modelUuid) for (path, digest, modelUuid) in cursor}
+
+    def replaceDigests(self, rows: Iterable[ProjectDigestRow]):
+        """Drop all project digests and record new ones.
+
+        Parameters
+        ----------
+        rows:
+            Digests of the merged projects
+        """
+        self._db.execute("DELETE FROM project")
+        self._db.executemany(
+            "INSERT OR REPLACE INTO project (path, digest, model_uuid) VALUES (?, ?, ?)",
+            rows,
+        )
+
+    def commit(self):
+        """Commit recorded rows."""
+        self._db.commit()
+
+    def close(self):
+        """Close the store, uncommitted rows are dropped."""
+        self._db.close()
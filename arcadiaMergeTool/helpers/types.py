@@ -1,4 +1,5 @@
 import typing as t
+from collections.abc import MutableMapping
 
 from capellambse.model import ModelElement
 
@@ -13,10 +14,12 @@ type MergerElementMappingEntry = tuple[
     FromLibrary,  # came from library flag
 ]
 
-type MergerElementMappingMap = dict[
-    tuple[
-        ModelUuid,  # model uuid
-        ComponentUuid,  # component uuid
-    ],
+type MergerElementMappingKey = tuple[
+    ModelUuid,  # model uuid
+    ComponentUuid,  # component uuid
+]
+
+type MergerElementMappingMap = MutableMapping[
+    MergerElementMappingKey,
     MergerElementMappingEntry
 ]
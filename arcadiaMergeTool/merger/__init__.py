@@ -1,8 +1,11 @@
 import os
 
 from arcadiaMergeTool import getLogger
-from arcadiaMergeTool.helpers.types import MergerElementMappingMap
-from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
+from arcadiaMergeTool.helpers.cache import LibraryRegistry, ModelFileCache
+from arcadiaMergeTool.helpers.idcache import syncRoots
+from arcadiaMergeTool.helpers.mapping import MergerElementMapping
+from arcadiaMergeTool.helpers.store import MappingStore, ProjectDigestRow
+from arcadiaMergeTool.models.capellaModel import loadModels
 from arcadiaMergeTool.models.config_model import ConfigModel
 from arcadiaMergeTool.models.config_project_model import ConfigProjectModel
 from arcadiaMergeTool.models.merger_config_model import MergerConfigModel
@@ -10,6 +13,14 @@ from arcadiaMergeTool.models.merger_config_model import MergerConfigModel
 from .elements import mergeElements
 from .extensions import mergeExtensions
 from .libraries import mergeLibraries
+from .persistence import (
+    ProjectDigests,
+    persistDigests,
+    persistMapping,
+    restoreMapping,
+    retractStale,
+    unchangedSources,
+)
 
 __all__ = [
     "merge",
@@ -25,28 +36,91 @@ def merge(config: ConfigModel):
     targetModel = config.target
     baseModel: ConfigProjectModel = config.base
 
+    infoPath = os.path.join(config.project.basePath, "debug/")
     mergerConfig = MergerConfigModel(
         basePath=config.project.basePath,
-        infoPath=os.path.join(config.project.basePath, "debug/"),
+        infoPath=infoPath,
         baseModel=baseModel,
         name=config.project.name,
+        mappingStorePath=os.path.join(infoPath, "mapping.sqlite") if config.project.persistMapping or config.project.incremental else None,
+        incremental=config.project.incremental,
+        verifyIdCache=config.project.verifyIdCache,
     )
     os.makedirs(mergerConfig.infoPath, exist_ok=True)
 
-    modelSrc = []
-    modelDst = CapellaMergeModel(targetModel, mergerConfig)
-    modelBase = CapellaMergeModel(baseModel, mergerConfig)
+    store = MappingStore(mergerConfig.mappingStorePath) if mergerConfig.mappingStorePath is not None else None
+    records = store.loadDigests() if store is not None and mergerConfig.incremental else {}
+    # digests are recorded with the mapping only, nothing to hash without the store
+    projectDigests = ProjectDigests(mergerConfig.basePath)
+    digests = {
+        item.projectPath: projectDigests.digestOf(item)
+        for item in [targetModel, baseModel, *extModels]
+    } if store is not None else {}
+    skipped = unchangedSources(records, digests, targetModel, baseModel, extModels) if store is not None else []
 
-    for item in extModels:
+    if store is not None and len(extModels) > 0 and len(skipped) == len(extModels):
+        LOGGER.info(f"[{merge.__name__}] target and all source models are unchanged since the previous run, nothing to merge")
+        store.close()
+        return
+
+    for item in skipped:
+        LOGGER.info(f"[{merge.__name__}] skip unchanged external models item ({item.name})")
+    items = [item for item in extModels if item not in skipped]
+    for item in items:
         LOGGER.debug(f"[{merge.__name__}] processing external models item ({item})")
-        model = CapellaMergeModel(item, mergerConfig)
 
-        modelSrc.append(model)
+    cache = ModelFileCache(os.path.join(config.project.basePath, config.project.modelCachePath)) if config.project.modelCachePath is not None else None
+
+    # base and sources are read-only, their libraries are loaded once; target gets own copies as it is modified
+    libraries = LibraryRegistry(
+        os.path.join(mergerConfig.basePath, lib.path) for item in [baseModel, *items] for lib in item.libs
+    )
+
+    # models are independent until merge, loaded concurrently with loadWorkers set
+    (modelDst, modelBase, *modelSrc) = loadModels(
+        [targetModel, baseModel, *items],
+        mergerConfig,
+        config.project.loadWorkers,
+        cache,
+        [None, libraries, *[libraries for _ in items]],
+    )
+    if cache is not None:
+        LOGGER.info(f"[{merge.__name__}] model file cache [{cache.path}], hits [{cache.hits}], misses [{cache.misses}]")
+    LOGGER.info(f"[{merge.__name__}] library files loaded [{libraries.loaded}], shared [{libraries.shared}]")
+    loaded = list(zip(items, modelSrc))
 
-    elementMappingMap: MergerElementMappingMap = {}
+    elementMappingMap = MergerElementMapping()
+    skippedUuids = {records[item.projectPath].modelUuid for item in skipped}
+    previous = store.load() if store is not None else []
+    carried = [row for row in previous if row.key[0] in skippedUuids]
+    previous = [row for row in previous if row.key[0] not in skippedUuids]
 
     mergeLibraries(modelDst, modelBase, modelSrc)
+    syncRoots(modelDst.model._loader)
+    if store is not None:
+        restoreMapping(previous, modelDst, modelSrc, elementMappingMap)
     mergeExtensions(modelDst, modelBase, modelSrc, elementMappingMap)
+    syncRoots(modelDst.model._loader)
     mergeElements(modelDst, modelBase, modelSrc, elementMappingMap)
 
+    if mergerConfig.incremental:
+        retractStale(previous, modelDst, elementMappingMap, carried)
+
     modelDst.save()
+
+    if store is not None:
+        persistMapping(store, modelSrc, elementMappingMap, carried)
+
+        projects = [(targetModel, modelDst.model.uuid), (baseModel, modelBase.model.uuid)]
+        projects.extend((item, model.model.uuid) for (item, model) in loaded)
+        # target content is changed by the merge, its libraries are not
+        projectDigests.forget(targetModel)
+        digests[targetModel.projectPath] = projectDigests.digestOf(targetModel)
+        rows = [
+            ProjectDigestRow(item.projectPath, digest, uuid)
+            for (item, uuid) in projects
+            if (digest := digests[item.projectPath]) is not None
+        ]
+        rows.extend(records[item.projectPath] for item in skipped)
+        persistDigests(store, rows)
+        store.close()
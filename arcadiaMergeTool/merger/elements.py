@@ -1,5 +1,6 @@
 import sys
 from collections import deque
+from collections.abc import Iterator
 from venv import logger
 
 import capellambse.metamodel as mm
@@ -10,20 +11,33 @@ from capellambse.model import ModelElement
 
 from arcadiaMergeTool import getLogger
 from arcadiaMergeTool.helpers import ExitCodes
+from arcadiaMergeTool.helpers.mapping import MergerElementMapping
 from arcadiaMergeTool.helpers.types import (
-    MergerElementMappingMap,
+    MergerElementMappingKey,
     ModelElement_co,
 )
 from arcadiaMergeTool.merger.processors import doProcess
-from arcadiaMergeTool.merger.processors._processor import Postponed
+from arcadiaMergeTool.merger.processors._processor import (
+    Postponed,
+    handlersTable,
+)
+from arcadiaMergeTool.merger.scheduler import findCycles, makeSchedule
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(name=__name__)
 
-def _makeModelElementList(
+_EXCLUDED_CLASSES = (
+    re.CatalogElement,
+    re.RecCatalog,
+    li.LibraryReference,
+    li.ModelInformation,
+)
+""" Elements processed outside of the elements merge"""
+
+def _iterModelElements(
     model: CapellaMergeModel, clsname: type[ModelElement_co] | None = None
-) -> deque[m._obj.ModelElement]:
-    """Fetch all model elements from model.
+) -> Iterator[m._obj.ModelElement]:
+    """Iterate lazily through all model elements.
 
     Parameters
     ----------
@@ -34,29 +48,184 @@ def _makeModelElementList(
 
     Returns
     -------
-    Filtered list of found objects
+    Generator of filtered objects in document order
+
+    Description
+    -----------
+    Walk source tree below the project following fragment links, wrap
+    and yield elements one by one. Excluded elements and elements not
+    matching requested type are dropped in the same pass, nothing is
+    collected up front.
     """
+    melodyModel = model.model
 
-    # TODO: models can be huge, use generators to iterate through the model
-    lst = deque(
-        filter(
-            lambda x: not isinstance(x, re.CatalogElement)
-            and not isinstance(x, re.RecCatalog)
-            and not isinstance(x, li.LibraryReference)
-            and not isinstance(x, li.ModelInformation),
-            model.model.search(ModelElement, below=model.model.project),
-        )
+    for elem in melodyModel._loader.iterdescendants(melodyModel.project._element):
+        if elem.get("id") is None:
+            # not a model element, i.e. text content
+            continue
+
+        x = m.wrap_xml(melodyModel, elem)
+        if isinstance(x, _EXCLUDED_CLASSES):
+            continue
+        if clsname is not None and not isinstance(x, clsname):
+            continue
+
+        yield x
+
+def _reportStall(
+    lst: deque[ModelElement | tuple[ModelElement, int]],
+    parked: dict[MergerElementMappingKey, tuple[ModelElement, int]],
+    waiting: dict[MergerElementMappingKey, list[MergerElementMappingKey]],
+):
+    """Report elements blocking the merge.
+
+    Parameters
+    ----------
+    lst:
+        Queue of postponed elements
+    parked:
+        Postponed elements parked on wait lists
+    waiting:
+        Keys reported by the last postpone of every element
+
+    Description
+    -----------
+    Called when a complete pass over pending elements maps nothing new.
+    Dependency cycles between pending elements are reported first, then
+    every pending element with the keys it waits on.
+    """
+    pending: dict[MergerElementMappingKey, ModelElement] = {}
+    for entry in list(lst) + list(parked.values()):
+        elem = entry[0] if isinstance(entry, tuple) else entry
+        pending[(elem._model.uuid, elem.uuid)] = elem
+
+    graph = {k: [w for w in waiting.get(k, []) if w in pending] for k in pending}
+    cycles = findCycles(graph)
+
+    LOGGER.fatal(
+        "[%s] Merge stalled, no element mapped during a complete pass; pending elements [%s], dependency cycles [%s]",
+        mergeElements.__qualname__,
+        len(pending),
+        len(cycles),
     )
-    if clsname is not None:
-        return deque(filter(lambda x: isinstance(x, clsname), lst))
+    for i, cycle in enumerate(cycles):
+        LOGGER.fatal(
+            "[%s] Dependency cycle [%s]: [%s]",
+            mergeElements.__qualname__,
+            i + 1,
+            " -> ".join(f"{pending[k].__class__.__name__} {k[1]}" for k in cycle + cycle[:1]),
+        )
+    for key, elem in pending.items():
+        LOGGER.fatal(
+            "[%s] Pending element name [%s], uuid [%s], class [%s], model [%s], waits on keys [%s]",
+            mergeElements.__qualname__,
+            getattr(elem, "name", None),
+            elem.uuid,
+            elem.__class__,
+            elem._model.name,
+            waiting.get(key, []),
+        )
+
+class _SourceQueue:
+    """Pending elements of the source model merge.
+
+    Parameters
+    ----------
+    dest:
+        Target model
+    base:
+        Common ancestor model
+    model:
+        Source model
+    mapping:
+        Element mapping
+    stats:
+        Number of processed elements by try
+    stats2:
+        Number of processed elements by class
+    """
+
+    def __init__(
+        self,
+        dest: CapellaMergeModel,
+        base: CapellaMergeModel,
+        model: CapellaMergeModel,
+        mapping: MergerElementMapping,
+        stats: list[int],
+        stats2: dict[str, int],
+    ):
+        self.dest = dest
+        self.base = base
+        self.model = model
+        self.mapping = mapping
+        self.stats = stats
+        self.stats2 = stats2
+        self.lst: deque[ModelElement | tuple[ModelElement, int]] = deque()
+        """Postponed elements to retry"""
+        self.parked: dict[MergerElementMappingKey, tuple[ModelElement, int]] = {}
+        """Postponed elements parked on wait lists"""
+        self.waiting: dict[MergerElementMappingKey, list[MergerElementMappingKey]] = {}
+        """Keys reported by the last postpone of every pending element"""
+
+    def process(self, elem: ModelElement, counter: int) -> bool:
+        """Process element and queue it up if it is postponed.
+
+        Parameters
+        ----------
+        elem:
+            Source model element
+        counter:
+            Number of the processing try
+
+        Returns
+        -------
+        False if element is postponed
+        """
+        if len(self.stats) < counter:
+            self.stats.append(1)
+        else:
+            self.stats[counter-1] = self.stats[counter-1]+1
+        cls = str(elem.__class__)
+        if self.stats2.get(cls) is None:
+            self.stats2[cls] = 1
+        elif counter == 1:
+            self.stats2[cls] = self.stats2[cls] + 1
+
+        if isinstance(elem, mm.modellingcore.AbstractNamedElement):
+            LOGGER.debug("[%s] Process element name [%s], uuid [%s], class [%s], model [%s]; queue length [%s], try [%s]", mergeElements.__qualname__, elem.name, elem.uuid, elem.__class__, elem._model.name, len(self.lst), counter)
+        else:
+            LOGGER.debug("[%s] Process element uuid [%s], class [%s], model [%s]; queue length [%s], try [%s]", mergeElements.__qualname__, elem.uuid, elem.__class__, elem._model.name, len(self.lst), counter)
+        res = doProcess(elem, self.dest, self.model, self.base, self.mapping)
+        keys = self.mapping.takeAwaited()
+        waiter = (elem._model.uuid, elem.uuid)
+        if res == Postponed:
+            self.waiting[waiter] = keys
+        else:
+            self.waiting.pop(waiter, None)
+
+        if res == Postponed and len(keys) > 0:
+            LOGGER.debug("[%s] element uuid [%s], class [%s], model [%s] parked on keys [%s]", mergeElements.__qualname__, elem.uuid, elem.__class__, elem._model.name, keys)
+            self.parked[waiter] = (elem, counter+1)
+            self.mapping.park(waiter, keys)
+        elif res == Postponed:
+            if isinstance(elem, mm.modellingcore.AbstractNamedElement):
+                LOGGER.debug("[%s] element name [%s], uuid [%s], class [%s], model [%s] put back to queue", mergeElements.__qualname__, elem.name, elem.uuid, elem.__class__, elem._model.name)
+            else:
+                LOGGER.debug("[%s] element uuid [%s], class [%s], model [%s] put back to queue", mergeElements.__qualname__, elem.uuid, elem.__class__, elem._model.name)
+            self.lst.append((elem, counter+1))
+
+        for woken in self.mapping.takeWoken():
+            entry = self.parked.pop(woken, None)
+            if entry is not None:
+                self.lst.append(entry)
 
-    return lst
+        return res != Postponed
 
 def mergeElements(
     dest: CapellaMergeModel,
     base: CapellaMergeModel,
     src: list[CapellaMergeModel],
-    mapping: MergerElementMappingMap,
+    mapping: MergerElementMapping,
 ):
     """Merge models.
 
@@ -67,7 +236,14 @@ def mergeElements(
     :param src: Description
     :type src: list[CapellaMergeModel]
     :param elementMappingMap: Description
-    :type elementMappingMap: MergerElementMappingMap
+    :type elementMappingMap: MergerElementMapping
+
+    Postponed elements reporting keys they wait on are parked on wait lists
+    of the mapping and return to the queue once any of those keys is mapped.
+    Other postponed elements are put back to the end of the queue.
+
+    Merge stops with the report of dependency cycles once a complete pass
+    over pending elements maps nothing new.
     """
 
     LOGGER.info("[%s] begin merging models into target model", mergeElements.__qualname__)
@@ -76,46 +252,52 @@ def mergeElements(
     stats2: dict[str, int] = {}
 
     for model in src:
-        lst: deque[ModelElement | tuple[ModelElement, int]] = _makeModelElementList(model) # pyright: ignore[reportAssignmentType] TODO: add contravatiant
+        queue = _SourceQueue(dest, base, model, mapping, stats, stats2)
+        lst = queue.lst
+        parked = queue.parked
 
         LOGGER.info("[%s] Start merge of source model [%s], uuid [%s] content", mergeElements.__qualname__, model.model.name, model.model.uuid)
-        while lst:
-            elem = lst.pop()
+
+        # first pass streams the schedule, only postponed elements are queued;
+        # dependency order makes most of the elements pass at first try, retry is only fallback
+        complete = True
+        progress = False
+        mapping.forgetPostponed()
+        mapped = len(mapping)
+        for elem in makeSchedule(_iterModelElements(model)):
+            progress = queue.process(elem, 1) or progress
+
+        # pass is the queue content at the pass start, complete pass covers all pending elements
+        remaining = 0
+        while lst or parked:
+            if remaining == 0:
+                progress = progress or len(mapping) != mapped
+                if not progress and complete:
+                    _reportStall(lst, parked, queue.waiting)
+                    sys.exit(str(ExitCodes.MergeFault))
+
+                if parked and (not lst or not progress):
+                    # nobody woke parked elements up, fall back to the blind retry
+                    LOGGER.debug("[%s] no progress on wait lists, retry [%s] parked elements", mergeElements.__qualname__, len(parked))
+                    lst.extend(parked.values())
+                    parked.clear()
+                    mapping.clearWaiters()
+
+                complete = not parked
+                remaining = len(lst)
+                progress = False
+                mapping.forgetPostponed()
+                mapped = len(mapping)
+
+            remaining -= 1
+            elem = lst.popleft()
             counter = 1
             if isinstance(elem, tuple):
                 (elem, counter) =elem
 
-            if len(stats) < counter:
-                stats.append(1)
-            else:
-                stats[counter-1] = stats[counter-1]+1
-            cls = str(elem.__class__)
-            if stats2.get(cls) is None:
-                stats2[cls] = 1
-            elif counter == 1:
-                stats2[cls] = stats2[cls] + 1
-
-
-            if counter > 25:
-                # TODO: make configurable, sometimes it takes up to 20 retries to complete merge
-                if isinstance(elem, mm.modellingcore.AbstractNamedElement):
-                    LOGGER.fatal("[%s] Processing retry threshold exceeded [%s], element name [%s], uuid [%s], class [%s], model [%s]; queue length [%s]", mergeElements.__qualname__, counter, elem.name, elem.uuid, elem.__class__, elem._model.name, len(lst))
-                else:
-                    LOGGER.fatal("[%s] Processing retry threshold exceeded [%s], element uuid [%s], class [%s], model [%s]; queue length [%s]", mergeElements.__qualname__, counter, elem.uuid, elem.__class__, elem._model.name, len(lst))
-                sys.exit(str(ExitCodes.MergeFault))
-
-            if isinstance(elem, mm.modellingcore.AbstractNamedElement):
-                LOGGER.debug("[%s] Process element name [%s], uuid [%s], class [%s], model [%s]; queue length [%s], try [%s]", mergeElements.__qualname__, elem.name, elem.uuid, elem.__class__, elem._model.name, len(lst), counter)
-            else:
-                LOGGER.debug("[%s] Process element uuid [%s], class [%s], model [%s]; queue length [%s], try [%s]", mergeElements.__qualname__, elem.uuid, elem.__class__, elem._model.name, len(lst), counter)
-            res = doProcess(elem, dest, model, base, mapping)
-            if res == Postponed:
-                if isinstance(elem, mm.modellingcore.AbstractNamedElement):
-                    LOGGER.debug("[%s] element name [%s], uuid [%s], class [%s], model [%s] put back to queue", mergeElements.__qualname__, elem.name, elem.uuid, elem.__class__, elem._model.name)
-                else:
-                    LOGGER.debug("[%s] element uuid [%s], class [%s], model [%s] put back to queue", mergeElements.__qualname__, elem.uuid, elem.__class__, elem._model.name)
-                lst.appendleft((elem, counter+1))
+            progress = queue.process(elem, counter) or progress
 
         LOGGER.info("[%s] Merge of source model [%s], uuid [%s] content completed", mergeElements.__qualname__, model.model.name, model.model.uuid)
 
     LOGGER.info("[%s] Elements merge complete, retries [%s], [%s]", mergeElements.__qualname__, stats, stats2)
+    LOGGER.debug("[%s] Element classes without processor [%s]", mergeElements.__qualname__, sorted(cls.__name__ for cls, h in handlersTable().items() if not h.supported))
@@ -0,0 +1,403 @@
+"""Reuse of the element mapping recorded by the previous merge run.
+
+Incremental merge
+1. Mapping entry of the previous run is restored if source element is
+   still there, its fingerprint is the same and neither its parent nor
+   elements it refers to are changed or dropped, such element is not
+   matched again
+2. Added and changed source elements go through the matchers as usual
+3. Destination elements created by the merger and not mapped by any
+   source element after the merge are retracted, unless other elements of
+   the destination still refer to them
+4. Source project with the same files and revisions as in the previous
+   run is not loaded at all when target and base are unchanged too, its
+   mapping entries are carried over and keep its contribution in place
+"""
+
+import hashlib
+import os
+import re
+from collections.abc import Iterable
+
+from capellambse import helpers
+from lxml import etree
+
+from arcadiaMergeTool import getLogger
+from arcadiaMergeTool.helpers.fingerprint import fingerprint
+from arcadiaMergeTool.helpers.idcache import removeElement
+from arcadiaMergeTool.helpers.mapping import MergerElementMapping
+from arcadiaMergeTool.helpers.store import (
+    MappingStore,
+    MappingStoreRow,
+    ProjectDigestRow,
+)
+from arcadiaMergeTool.helpers.types import MergerElementMappingKey
+from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
+from arcadiaMergeTool.models.config_project_model import ConfigProjectModel
+
+LOGGER = getLogger(__name__)
+
+_REFERENCE = re.compile(r"#([^\s#]+)")
+
+_MODEL_FILES = (".capella", ".capellafragment", ".afm")
+
+def _feedFiles(h: "hashlib.blake2b", path: str) -> bool:
+    if not os.path.isdir(path):
+        # remote model, its content is known to capellambse only
+        return False
+
+    for (root, dirs, files) in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if not name.endswith(_MODEL_FILES):
+                continue
+            fullName = os.path.join(root, name)
+            h.update(os.path.relpath(fullName, path).encode())
+            h.update(b"\x00")
+            with open(fullName, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            h.update(b"\x01")
+    return True
+
+class ProjectDigests:
+    """Content digests of merged projects.
+
+    Parameters
+    ----------
+    basePath:
+        Base path of the merge project
+
+    Description
+    -----------
+    Model files of every directory are hashed once and the digest is
+    reused by all projects referring to the same directory, like library
+    shared by base and source projects.
+    """
+
+    def __init__(self, basePath: str):
+        self.basePath = basePath
+        self._directories: dict[str, str | None] = {}
+
+    def _directoryOf(self, path: str) -> str:
+        path = os.path.join(self.basePath, path)
+        if os.path.isfile(path):
+            path = os.path.dirname(path)
+        return os.path.realpath(path)
+
+    def _directoryDigest(self, path: str) -> str | None:
+        directory = self._directoryOf(path)
+        if directory not in self._directories:
+            h = hashlib.blake2b(digest_size=16)
+            self._directories[directory] = h.hexdigest() if _feedFiles(h, directory) else None
+        return self._directories[directory]
+
+    def digestOf(self, model: ConfigProjectModel) -> str | None:
+        """Make digest of the project content.
+
+        Parameters
+        ----------
+        model:
+            Project configuration
+
+        Returns
+        -------
+        Hex digest of the model files, library files and revisions, None
+        when model or one of libraries is not a local path
+        """
+        modelDigest = self._directoryDigest(model.projectPath)
+        if modelDigest is None:
+            return None
+
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{modelDigest}\x02{model.gitModelAttrib}\x02{model.gitLibAttrib}".encode())
+        for lib in model.libs:
+            libDigest = self._directoryDigest(lib.path)
+            if libDigest is None:
+                return None
+            h.update(f"\x03{lib.name}\x03{libDigest}".encode())
+
+        return h.hexdigest()
+
+    def forget(self, model: ConfigProjectModel):
+        """Drop digest of the project model files, e.g. after the model is saved.
+
+        Parameters
+        ----------
+        model:
+            Project configuration
+        """
+        self._directories.pop(self._directoryOf(model.projectPath), None)
+
+def unchangedSources(
+    records: dict[str, ProjectDigestRow],
+    digests: dict[str, str | None],
+    target: ConfigProjectModel,
+    base: ConfigProjectModel,
+    models: list[ConfigProjectModel],
+) -> list[ConfigProjectModel]:
+    """Select source projects which need no merge.
+
+    Parameters
+    ----------
+    records:
+        Project digests of the previous run
+    digests:
+        Current project digests by project path
+    target:
+        Target project configuration
+    base:
+        Base project configuration
+    models:
+        Source project configurations
+
+    Returns
+    -------
+    Source projects with unchanged content, empty when target or base has
+    changed since the previous run
+    """
+    def unchanged(model: ConfigProjectModel) -> bool:
+        record = records.get(model.projectPath)
+        digest = digests.get(model.projectPath)
+        return record is not None and digest is not None and record.digest == digest
+
+    if not unchanged(target) or not unchanged(base):
+        return []
+    return [model for model in models if unchanged(model)]
+
+def _findElement(model: CapellaMergeModel, uuid: str) -> etree._Element | None:
+    try:
+        return model.model._loader[uuid]
+    except KeyError:
+        return None
+
+def _dependencyIds(el: etree._Element) -> set[str]:
+    """Collect uuids of the parent and elements referred by the element."""
+    ids: set[str] = set()
+    parent = el.getparent()
+    if parent is not None and parent.get("id") is not None:
+        ids.add(parent.get("id")) # pyright: ignore[reportArgumentType] checked above
+
+    stack = [el]
+    while stack:
+        node = stack.pop()
+        for (k, v) in node.attrib.items():
+            if k != "id":
+                ids.update(_REFERENCE.findall(v))
+        stack.extend(child for child in node if child.get("id") is None)
+
+    return ids
+
+def restoreMapping(
+    rows: list[MappingStoreRow],
+    dest: CapellaMergeModel,
+    src: list[CapellaMergeModel],
+    mapping: MergerElementMapping,
+):
+    """Seed the mapping with unchanged entries of the previous run.
+
+    Parameters
+    ----------
+    rows:
+        Rows of the previous run for the loaded source models
+    dest:
+        Target model
+    src:
+        Source models
+    mapping:
+        Mapping to seed
+    """
+    models = {s.model.uuid: s for s in src}
+    candidates: list[tuple[MappingStoreRow, etree._Element]] = []
+    dependents: dict[MergerElementMappingKey, list[MergerElementMappingKey]] = {}
+    changed: list[MergerElementMappingKey] = []
+    skipped = 0
+
+    for row in rows:
+        model = models.get(row.key[0])
+        srcEl = _findElement(model, row.key[1]) if model is not None else None
+        destEl = _findElement(dest, row.destUuid)
+        if row.created and destEl is not None:
+            # element matched again keeps its origin, it is retracted once
+            # no source contributes it any more
+            mapping.markCloned(row.destUuid)
+
+        if srcEl is None or destEl is None:
+            # dependents of the dropped entry are matched again as well
+            changed.append(row.key)
+            skipped += 1
+            continue
+
+        if row.fingerprint is None or row.fingerprint != fingerprint(srcEl):
+            changed.append(row.key)
+
+        candidates.append((row, srcEl))
+        for uuid in _dependencyIds(srcEl):
+            dependents.setdefault((row.key[0], uuid), []).append(row.key)
+
+    # elements nested into or referring to changed elements are matched again,
+    # their destination depends on the match of changed element
+    invalid = set(changed)
+    pending = list(changed)
+    while pending:
+        for key in dependents.get(pending.pop(), ()):
+            if key not in invalid:
+                invalid.add(key)
+                pending.append(key)
+
+    restored = 0
+    for (row, _) in candidates:
+        if row.key in invalid:
+            continue
+
+        mapping[row.key] = (dest.model.by_uuid(row.destUuid), row.fromLibrary)
+        restored += 1
+
+    LOGGER.info(
+        "[%s] Mapping restored, entries restored [%s], changed [%s], skipped [%s]",
+        restoreMapping.__qualname__,
+        restored,
+        len(candidates) - restored,
+        skipped,
+    )
+
+def _isProtected(root: etree._Element, mapping: MergerElementMapping, kept: set[str]) -> bool:
+    for el in root.iter():
+        uuid = el.get("id")
+        if uuid is not None and (uuid in kept or len(mapping.sourcesOf(uuid)) > 0):
+            return True
+    return False
+
+def _referencedIds(dest: CapellaMergeModel, skip: set[int]) -> set[str]:
+    referenced: set[str] = set()
+    stack = [tree.root for tree in dest.model._loader.trees.values()]
+    while stack:
+        el = stack.pop()
+        if id(el) in skip:
+            continue
+        for (k, v) in el.attrib.items():
+            if k != "id":
+                referenced.update(_REFERENCE.findall(v))
+        stack.extend(el)
+    return referenced
+
+def retractStale(
+    rows: Iterable[MappingStoreRow],
+    dest: CapellaMergeModel,
+    mapping: MergerElementMapping,
+    carried: Iterable[MappingStoreRow] = (),
+) -> int:
+    """Remove destination elements no longer contributed by any source.
+
+    Parameters
+    ----------
+    rows:
+        Rows of the previous run, except carried ones
+    dest:
+        Target model
+    mapping:
+        Mapping of the finished merge
+    carried:
+        Rows of the skipped source models, their elements are kept
+
+    Returns
+    -------
+    Number of retracted elements
+    """
+    kept = {row.destUuid for row in carried}
+    candidates: dict[str, etree._Element] = {}
+    for row in rows:
+        if not row.created or row.fromLibrary or row.destUuid in candidates:
+            continue
+        if row.destUuid in kept or len(mapping.sourcesOf(row.destUuid)) > 0:
+            continue
+        el = _findElement(dest, row.destUuid)
+        if el is not None and not _isProtected(el, mapping, kept):
+            candidates[row.destUuid] = el
+
+    # nested candidates leave the model together with the outer one
+    roots = [el for el in candidates.values() if not any(a.get("id") in candidates for a in el.iterancestors())]
+    if len(roots) == 0:
+        return 0
+
+    referenced = _referencedIds(dest, {id(el) for el in roots})
+    retracted = 0
+    for el in roots:
+        ids = {y.get("id") for y in el.iter()}
+        if not referenced.isdisjoint(ids):
+            LOGGER.warning(
+                "[%s] Stale element is still referenced, keep it, uuid [%s], class [%s]",
+                retractStale.__qualname__,
+                el.get("id"),
+                helpers.xtype_of(el),
+            )
+            continue
+
+        LOGGER.debug(
+            "[%s] Retract stale element uuid [%s], class [%s]",
+            retractStale.__qualname__,
+            el.get("id"),
+            helpers.xtype_of(el),
+        )
+        removeElement(dest.model._loader, el)
+        retracted += 1
+
+    LOGGER.info(
+        "[%s] Stale elements retracted [%s]",
+        retractStale.__qualname__,
+        retracted,
+    )
+    return retracted
+
+def persistMapping(
+    store: MappingStore,
+    src: list[CapellaMergeModel],
+    mapping: MergerElementMapping,
+    carried: list[MappingStoreRow] | None = None,
+):
+    """Record the mapping for the next run.
+
+    Parameters
+    ----------
+    store:
+        Store to write to
+    src:
+        Source models
+    mapping:
+        Mapping of the finished merge
+    carried:
+        Rows of the skipped source models, recorded as they are
+    """
+    carried = carried if carried is not None else []
+    models = {s.model.uuid: s for s in src}
+
+    def withFingerprints():
+        for row in mapping.rows():
+            model = models.get(row.key[0])
+            srcEl = _findElement(model, row.key[1]) if model is not None else None
+            yield row._replace(fingerprint = fingerprint(srcEl) if srcEl is not None else None)
+        yield from carried
+
+    store.replace(withFingerprints())
+    store.commit()
+
+    LOGGER.info(
+        "[%s] Mapping recorded into [%s], entries [%s], carried [%s]",
+        persistMapping.__qualname__,
+        store.path,
+        len(mapping),
+        len(carried),
+    )
+
+def persistDigests(store: MappingStore, rows: Iterable[ProjectDigestRow]):
+    """Record project digests for the next run.
+
+    Parameters
+    ----------
+    store:
+        Store to write to
+    rows:
+        Digests of the merged projects, target digest is taken after save
+    """
+    store.replaceDigests(rows)
+    store.commit()
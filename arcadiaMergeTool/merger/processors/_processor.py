@@ -1,7 +1,7 @@
 import sys
 import typing as t
-from collections.abc import Callable
-from enum import Enum
+from collections.abc import Callable, Iterable
+from enum import Enum, IntEnum
 from functools import singledispatch
 
 import capellambse.metamodel as mm
@@ -12,7 +12,12 @@ from capellambse.model import ModelElement
 
 from arcadiaMergeTool import getLogger
 from arcadiaMergeTool.helpers import ExitCodes
-from arcadiaMergeTool.helpers.types import MergerElementMappingMap
+from arcadiaMergeTool.helpers.idcache import fragmentRoot, syncRoots
+from arcadiaMergeTool.helpers.mapping import MergerElementMapping
+from arcadiaMergeTool.helpers.types import (
+    MergerElementMappingKey,
+    MergerElementMappingMap,
+)
 from arcadiaMergeTool.merger.processors.helpers import getDestParent
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
@@ -24,6 +29,17 @@ class ProcessingResult(Enum):
     Continue = 3
     Fault = 4
 
+class MatchKey(Enum):
+    """Kind of key matcher uses to find existing element."""
+    Custom = 1
+    Name = 2
+    Endpoints = 3
+
+class ProcessingPhase(IntEnum):
+    """Processing order of element kinds, lower phases are processed first."""
+    Elements = 0
+    Relations = 1
+
 type ProcessedType = t.Literal[ProcessingResult.Processed]
 type PostponeType = t.Literal[ProcessingResult.Postponed]
 type ContinueType = t.Literal[ProcessingResult.Continue]
@@ -40,6 +56,7 @@ MatchReturnType = list[T] | ProcessedType | PostponeType
 DoProcessReturnType = ProcessedType | PostponeType
 
 type PreProcessReturnType = ProcessedType | PostponeType | ContinueType
+type DependenciesReturnType = Iterable[ModelElement | None]
 
 @singledispatch
 def preprocess(_x: T,
@@ -65,6 +82,117 @@ def preprocess(_x: T,
     """
     return Continue # allow to proceed if not overloaded
 
+@singledispatch
+def dependencies(x: T) -> DependenciesReturnType:
+    """Default dependency resolver.
+
+    Parameters
+    ----------
+    :param x: current element
+
+    Returns
+    -------
+    elements which must be mapped before current element can be matched
+
+    Description
+    -----------
+    Dependencies are used by the scheduler to order elements before
+    processing. Parent and type are always considered and must not be
+    returned here. Overloads must list elements resolved by preprocessor
+    or matcher of the element
+    """
+    if isinstance(x, mc.AbstractTrace):
+        return (x.source, x.target)
+    if isinstance(x, cc.Involvement):
+        return (x.involved,)
+    return ()
+
+@singledispatch
+def phase(_x: T) -> ProcessingPhase:
+    """Default processing phase.
+
+    Parameters
+    ----------
+    :param x: current element
+
+    Returns
+    -------
+    phase rank of the element kind
+
+    Description
+    -----------
+    Phase is used by the scheduler to process element kinds in order, i.e.
+    exchanges are not tried before their functions. Dependencies of the
+    element take priority over the phase, element of lower phase becomes
+    ready once its dependencies are processed and lands before the rest
+    of higher phase elements.
+    """
+    return ProcessingPhase.Elements
+
+@singledispatch
+def matchKey(_x: T) -> MatchKey:
+    """Default match key kind.
+
+    Parameters
+    ----------
+    :param x: current element
+
+    Returns
+    -------
+    kind of key used by the matcher of the element
+
+    Description
+    -----------
+    Name kind must be declared only for matchers comparing names of the
+    collection elements and doing nothing else
+    """
+    return MatchKey.Custom
+
+def collectDependencies(x: ModelElement) -> list[ModelElement]:
+    """Collect elements current element depends on.
+
+    Parameters
+    ----------
+    x:
+        Element to collect dependencies for
+
+    Returns
+    -------
+    Parent, type and elements reported by dependency resolver
+    """
+    deps: list[ModelElement | None] = []
+
+    if isinstance(x.parent, ModelElement):
+        deps.append(x.parent)
+    if isinstance(x, mc.AbstractTypedElement):
+        deps.append(x.type)
+    deps.extend(handlersOf(x).dependencies(x))
+
+    return [y for y in deps if isinstance(y, ModelElement) and y.uuid != x.uuid]
+
+def postponeUntil(mapping: MergerElementMappingMap, *keys: MergerElementMappingKey) -> PostponeType:
+    """Postpone processing until any of the keys is mapped.
+
+    Parameters
+    ----------
+    mapping:
+        Cache to report keys to
+    keys:
+        Mapping keys blocking element processing
+
+    Returns
+    -------
+    Postponed flag
+    """
+    if isinstance(mapping, MergerElementMapping):
+        mapping.awaitKeys(*keys)
+    return Postponed
+
+def _postponeOnDependencies(x: ModelElement, mapping: MergerElementMappingMap) -> PostponeType:
+    """Postpone processing until any of unmapped dependencies is mapped."""
+    keys = [(y._model.uuid, y.uuid) for y in collectDependencies(x)]
+    return postponeUntil(mapping, *(k for k in keys if k not in mapping))
+
 @singledispatch
 def clone (x: T,
     _coll: m.ElementList[T],
@@ -106,6 +234,95 @@ def process(x: T,
     # default behavior for any ModelElement if no more specific overload is found
     return Processed # mark elements processed by default
 
+def _matchKeyOf(x: ModelElement) -> MatchKey:
+    """Get match key kind, valid only if declared for the same matcher."""
+    cls = x.__class__
+    fn = matchKey.dispatch(cls)
+    for k, f in matchKey.registry.items():
+        if f is fn and k is not object and match.dispatch(k) is not match.dispatch(cls):
+            # subclass overrides matcher without declaring its key
+            return MatchKey.Custom
+    return fn(x)
+
+class Handlers(t.NamedTuple):
+    """Processor handlers and metadata resolved for the element class."""
+    preprocess: Callable[..., PreProcessReturnType]
+    process: Callable[..., ProcessReturnType]
+    match: Callable[..., MatchReturnType]
+    clone: Callable[..., ModelElement]
+    dependencies: Callable[..., DependenciesReturnType]
+    phase: ProcessingPhase
+    matchKey: MatchKey
+    supported: bool
+
+_handlers: dict[type, Handlers] = {}
+
+def _dropHandlersOnRegister(generic):
+    """Make registration in the generic function drop resolved records."""
+    register = generic.register
+
+    def registerAndDrop(cls, func=None):
+        result = register(cls, func)
+        _handlers.clear()
+        if func is None and result is not cls:
+            # register(cls) used as decorator, registration is done on its call
+            def decorate(f):
+                registered = result(f)
+                _handlers.clear()
+                return registered
+            return decorate
+        return result
+
+    generic.register = registerAndDrop
+
+for _generic in (preprocess, process, match, clone, dependencies, phase, matchKey):
+    _dropHandlersOnRegister(_generic)
+
+def handlersOf(x: ModelElement) -> Handlers:
+    """Get handlers for the element.
+
+    Parameters
+    ----------
+    x:
+        Element to get handlers for
+
+    Returns
+    -------
+    Handlers record of the element class
+
+    Description
+    -----------
+    Record is resolved once per concrete class out of the generic functions,
+    any registration in the generics, including replacement of registered
+    implementation, drops all resolved records.
+    """
+    cls = x.__class__
+    record = _handlers.get(cls)
+    if record is None:
+        proc = process.dispatch(cls)
+        record = Handlers(
+            preprocess = preprocess.dispatch(cls),
+            process = proc,
+            match = match.dispatch(cls),
+            clone = clone.dispatch(cls),
+            dependencies = dependencies.dispatch(cls),
+            phase = phase.dispatch(cls)(x),
+            matchKey = _matchKeyOf(x),
+            supported = proc is not process.registry[object],
+        )
+        _handlers[cls] = record
+
+    return record
+
+def handlersTable() -> dict[type, Handlers]:
+    """Get handlers resolved so far.
+
+    Returns
+    -------
+    Copy of resolved records by element class
+    """
+    return dict(_handlers)
+
 def doRecord(matchColl: list[T], x: T, destParent: T, destColl: m.ElementList[T], mapping: MergerElementMappingMap):
     """Record match in cache or fail.
 
@@ -162,6 +379,8 @@ def doRecord(matchColl: list[T], x: T, destParent: T, destColl: m.ElementList[T]
     if len(matchColl) > 0:
         # assume it's same to take first, but theme might be more
         destEl = matchColl[0]
+        if isinstance(mapping, MergerElementMapping):
+            mapping.dropCreated(destEl.uuid)
 
         mappedEl = mapping.get((destEl._model.uuid, destEl.uuid))
         fromLibrary = mappedEl[1] if mappedEl is not None else False
@@ -206,10 +425,159 @@ def doRecord(matchColl: list[T], x: T, destParent: T, destColl: m.ElementList[T]
                 x._model.uuid,
             )
 
-        destEl = clone(x, destColl, mapping)
+        root = fragmentRoot(destParent._element)
+        destEl = handlersOf(x).clone(x, destColl, mapping)
+        if fragmentRoot(destEl._element) is not root:
+            # element of a new namespace replaced the fragment root
+            syncRoots(destEl._model._loader)
+        if isinstance(mapping, MergerElementMapping):
+            mapping.recordCreated(destEl.uuid, (x._model.uuid, x.uuid))
+            mapping.recordAdded(destColl, destEl)
 
     mapping[(x._model.uuid, x.uuid)] = (destEl, fromLibrary)
 
+def _nextDependency(x: ModelElement, mapping: MergerElementMappingMap, visited: set[MergerElementMappingKey]) -> ModelElement | None:
+    """Find next parent or type to process before the element."""
+    if (x._model.uuid, x.uuid) in mapping or isinstance(x, mm.capellamodeller.Project):
+        return None
+
+    deps: list[ModelElement | None] = []
+    if isinstance(x.parent, m.ModelElement):
+        # parent processing is a must to avoid cases when child lands to unprocessed element
+        deps.append(x.parent)
+    if isinstance(x, mc.AbstractTypedElement):
+        # hack for processing of typed elements types, they are not processed by matcher
+        deps.append(x.type)
+
+    for dep in deps:
+        if dep is None:
+            continue
+        key = (dep._model.uuid, dep.uuid)
+        if key not in mapping and key not in visited:
+            return dep
+
+    return None
+
+def _mapFromLibrary(x: ModelElement, dest: CapellaMergeModel, mapping: MergerElementMappingMap) -> bool:
+    """Map library element to the same element of the library linked into destination.
+
+    Parameters
+    ----------
+    x:
+        Source element to map
+    dest:
+        Destination model
+    mapping:
+        Cache to record element in
+
+    Returns
+    -------
+    True if element is recorded, False otherwise
+
+    Description
+    -----------
+    Library elements keep their uuids in every model linking the library,
+    element is recorded as is when destination has element with the same
+    uuid and class in the fragment of the same library.
+    """
+    key = (x._model.uuid, x.uuid)
+    if key in mapping:
+        return False
+
+    fragment = x._model._loader.find_fragment(x._element)
+    if fragment.parts[0] == "\x00":
+        # element of the model itself, not of a library
+        return False
+
+    try:
+        destElem = dest.model._loader[x.uuid]
+    except KeyError:
+        return False
+
+    if dest.model._loader.find_fragment(destElem) != fragment:
+        return False
+
+    destEl = m.wrap_xml(dest.model, destElem)
+    if destEl.__class__ is not x.__class__:
+        return False
+
+    LOGGER.debug(
+        "[%s] Map library element uuid [%s], class [%s], library [%s], model name [%s], uuid [%s]",
+        doProcess.__qualname__,
+        x.uuid,
+        x.__class__,
+        fragment,
+        x._model.name,
+        x._model.uuid,
+    )
+    mapping[key] = (destEl, True)
+    return True
+
+def _mapFromBase(x: ModelElement, dest: CapellaMergeModel, base: CapellaMergeModel, mapping: MergerElementMappingMap) -> bool:
+    """Map element unchanged from base to the same element of destination.
+
+    Parameters
+    ----------
+    x:
+        Source element to map, its parent is already processed
+    dest:
+        Destination model
+    base:
+        Base model, common ancestor of source and destination
+    mapping:
+        Cache to record element in
+
+    Returns
+    -------
+    True if element is recorded, False otherwise
+
+    Description
+    -----------
+    Element which is identical to its base counterpart brings nothing to
+    merge, it is recorded as is when destination has element with the same
+    uuid and class under the element mapped from its source parent.
+    Destination version of such element wins, matchers and post-processors
+    are not run.
+    """
+    if not isinstance(mapping, MergerElementMapping) or isinstance(x, mm.capellamodeller.Project):
+        return False
+
+    if x._model._loader.find_fragment(x._element).parts[0] != "\x00":
+        # element of library, not derived from base
+        return False
+
+    try:
+        destElem = dest.model._loader[x.uuid]
+    except KeyError:
+        return False
+
+    if dest.model._loader.find_fragment(destElem).parts[0] != "\x00":
+        return False
+
+    if isinstance(x.parent, ModelElement):
+        mappedParent = mapping.get((x._model.uuid, x.parent.uuid))
+        destParent = destElem.getparent()
+        if mappedParent is None or destParent is None or mappedParent[0].uuid != destParent.get("id"):
+            return False
+
+    if not mapping.ancestors(base.model).unchanged(x._element):
+        return False
+
+    destEl = m.wrap_xml(dest.model, destElem)
+    if destEl.__class__ is not x.__class__:
+        return False
+
+    LOGGER.debug(
+        "[%s] Map element unchanged from base uuid [%s], class [%s], model name [%s], uuid [%s]",
+        doProcess.__qualname__,
+        x.uuid,
+        x.__class__,
+        x._model.name,
+        x._model.uuid,
+    )
+    mapping[(x._model.uuid, x.uuid)] = (destEl, False)
+    return True
+
 def doProcess (
     x: ModelElement | None,
     dest: CapellaMergeModel,
@@ -217,12 +585,139 @@ def doProcess (
     base: CapellaMergeModel,
     mapping: MergerElementMappingMap,
 ) -> DoProcessReturnType:
+    """Process element and its parents and types.
+
+    Parameters
+    ----------
+    x:
+        Source element to process
+    dest:
+        Destination model
+    src:
+        Source model
+    base:
+        Base model
+    mapping:
+        Cache of mapped elements
+
+    Returns
+    -------
+    Processed or Postponed flag
+
+    Description
+    -----------
+    Parents and types are resolved on the explicit stack, deepest first, so
+    package hierarchy depth does not add up to the recursion depth. When any
+    element on the stack is postponed, all elements above it are postponed
+    as well.
+
+    Elements of libraries linked into destination are mapped by identity,
+    so are elements unchanged from base and present in destination.
+    """
     if x is None:
         return Processed
 
+    stack = [x]
+    visited = {(x._model.uuid, x.uuid)}
+
+    while stack:
+        y = stack[-1]
+        if _mapFromLibrary(y, dest, mapping):
+            # library elements are not merged, neither their parents
+            stack.pop()
+            continue
+
+        dep = _nextDependency(y, mapping, visited)
+        if dep is not None:
+            visited.add((dep._model.uuid, dep.uuid))
+            stack.append(dep)
+            continue
+
+        stack.pop()
+        if _processKnown(y, dest, src, base, mapping) == Postponed:
+            for z in reversed(stack):
+                _postponeOnDependencies(z, mapping)
+            return Postponed
+
+    return Processed
+
+def _attachMissing(coll: m.ElementList, values: Iterable[ModelElement], mapping: MergerElementMappingMap):
+    """Attach mapped values missing in the destination collection.
+
+    Parameters
+    ----------
+    coll:
+        Destination collection of applied values
+    values:
+        Source values, already mapped
+    mapping:
+        Cache holding mapped values
+    """
+    known = {y.uuid for y in coll}
+    missing = []
+    for p in values:
+        v = mapping[(p._model.uuid, p.uuid)][0]
+        if v.uuid not in known:
+            known.add(v.uuid)
+            missing.append(v)
+
+    if len(missing) > 0:
+        coll.extend(missing)
+
+def _isFreshChild(
+    x: ModelElement,
+    handlers: Handlers,
+    destParent: ModelElement,
+    destColl: m.ElementList,
+    mapping: MergerElementMappingMap,
+) -> bool:
+    """Check if element lands into collection of freshly cloned parent."""
+    if handlers.matchKey != MatchKey.Name or not isinstance(mapping, MergerElementMapping):
+        return False
+
+    owner = getattr(destColl, "_parent", None)
+    if not isinstance(owner, ModelElement) or owner.uuid != destParent.uuid or not isinstance(x.parent, ModelElement):
+        return False
+
+    return mapping.claimFreshName(destParent.uuid, (x._model.uuid, x.parent.uuid), x.name)
+
+def _processKnown(
+    x: ModelElement,
+    dest: CapellaMergeModel,
+    src: CapellaMergeModel,
+    base: CapellaMergeModel,
+    mapping: MergerElementMappingMap,
+) -> DoProcessReturnType:
+    """Process single element unless it is already known as postponed."""
+    if not isinstance(mapping, MergerElementMapping):
+        return _processElement(x, dest, src, base, mapping)
+
+    key = (x._model.uuid, x.uuid)
+    if mapping.knownPostponed(key):
+        # nothing was mapped since the last attempt, result is the same
+        return Postponed
+
+    mark = mapping.awaitedMark()
+    res = _processElement(x, dest, src, base, mapping)
+    if res == Postponed:
+        mapping.markPostponed(key, mark)
+
+    return res
+
+def _processElement(
+    x: ModelElement,
+    dest: CapellaMergeModel,
+    src: CapellaMergeModel,
+    base: CapellaMergeModel,
+    mapping: MergerElementMappingMap,
+) -> DoProcessReturnType:
+    """Process single element, parents and types are already processed."""
     cachedElement = mapping.get((x._model.uuid, x.uuid))
 
     if cachedElement is None:
+        if _mapFromBase(x, dest, base, mapping):
+            return Processed
+
         if isinstance(x, mm.capellacore.NamedElement):
             LOGGER.debug(
                 f"[{doProcess.__qualname__}] Add new element to model name [%s], uuid [%s], class [%s], model name [%s], uuid [%s]",  # noqa: G004
@@ -246,23 +741,16 @@ def doProcess (
             mapping[(x._model.uuid, x.uuid)] = (dest.model.project, True)
             return Processed
 
+        handlers = handlersOf(x)
+
         #######################################
         # PREPROCESSORS
         #######################################
 
-        if isinstance(x, m.ModelElement) and isinstance(x.parent, m.ModelElement):  # noqa: SIM102
-            # parent processing is a must to avoid cases when child lands to unprocessed element
-            if doProcess(x.parent, dest, src, base, mapping) == Postponed:
-                return Postponed
-
-        if isinstance(x, mc.AbstractTypedElement) and x.type is not None:  # noqa: SIM102
-            # hack for processing of typed elements types, they are not processed by matcher
-            if doProcess(x.type, dest, src, base, mapping) == Postponed:
-                return Postponed
-
-        prep = preprocess(x, dest, src, base, mapping)
-        if prep in (Postponed, Processed):
-            # for both cases - exit processing loop
+        prep = handlers.preprocess(x, dest, src, base, mapping)
+        if prep == Postponed:
+            return _postponeOnDependencies(x, mapping)
+        if prep == Processed:
             return prep
 
         #######################################
@@ -270,10 +758,10 @@ def doProcess (
         #######################################
 
         # find correct collection to add element to
-        destColl = process(x, dest, src, base, mapping)
+        destColl = handlers.process(x, dest, src, base, mapping)
 
         if destColl == Postponed:
-            return Postponed
+            return _postponeOnDependencies(x, mapping)
 
         if destColl == Fault:
             if isinstance(x, mm.capellacore.NamedElement):
@@ -304,9 +792,15 @@ def doProcess (
 
             destParent = getDestParent(x, mapping)
 
-            # check for existing elements
-            matchColl = match(x, destParent, destColl, mapping)
-            if matchColl in (Processed, Postponed):
+            if _isFreshChild(x, handlers, destParent, destColl, mapping):
+                # parent is just cloned from the element parent, nothing to match against
+                matchColl = []
+            else:
+                # check for existing elements
+                matchColl = handlers.match(x, destParent, destColl, mapping)
+            if matchColl == Postponed:
+                return _postponeOnDependencies(x, mapping)
+            if matchColl == Processed:
                 return matchColl
 
             # complete record of element into destination model
@@ -352,15 +846,11 @@ def doProcess (
         if (isinstance(mappedXEl, cc.CapellaElement)):
             for p in x.applied_property_values:
                 doProcess(p, dest, src, base, mapping)
-                v = mapping[(p._model.uuid, p.uuid)][0]
-                if len(mappedXEl.applied_property_values.filter(lambda y: y.uuid == v.uuid)) == 0:
-                    mappedXEl.applied_property_values.append(v)
+            _attachMissing(mappedXEl.applied_property_values, x.applied_property_values, mapping)
 
             for p in x.applied_property_value_groups:
                 doProcess(p, dest, src, base, mapping)
-                v = mapping[(p._model.uuid, p.uuid)][0]
-                if len(mappedXEl.applied_property_value_groups.filter(lambda y: y.uuid == v.uuid)) == 0:
-                    mappedXEl.applied_property_value_groups.append(v)
+            _attachMissing(mappedXEl.applied_property_value_groups, x.applied_property_value_groups, mapping)
 
         #######################################
         # POSTPROCESSORS END
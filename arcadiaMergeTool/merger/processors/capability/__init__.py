@@ -6,11 +6,16 @@ from arcadiaMergeTool import getLogger
 from arcadiaMergeTool.helpers.types import MergerElementMappingMap
 from arcadiaMergeTool.merger.processors._processor import (
     Fault,
+    MatchKey,
     clone,
     match,
+    matchKey,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    matchByName,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 from . import exploitation, involvement, realization
@@ -68,8 +73,12 @@ def _(
 def _(x: T,
     _destParent: m.ModelElement,
     coll: m.ElementList[T],
-    _mapping: MergerElementMappingMap
+    mapping: MergerElementMappingMap
 ):
     # use weak match by name
     # TODO: implement strong match by PVMT properties
-    return list(filter(lambda y: y.name == x.name, coll))
+    return matchByName(x, coll, mapping)
+
+@matchKey.register
+def _(_x: T):
+    return MatchKey.Name
@@ -8,6 +8,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     Fault,
     Postponed,
     clone,
+    dependencies,
     match,
     process,
 )
@@ -30,6 +31,10 @@ def _(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
         summary = x.summary,
     )
 
+@dependencies.register
+def _(x: T):
+    return (x.capability,)
+
 @process.register
 def _(
     x: T,
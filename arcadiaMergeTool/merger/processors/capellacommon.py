@@ -14,7 +14,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     preprocess,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import getDestParent, matchByEndpoints
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -81,4 +81,4 @@ def _(x: T,
         # if source or target is not mapped, postpone allocation processing
         return Postponed
 
-    return list(filter(lambda y: y.source == mappedSource[0] and y.target == mappedTarget[0], coll)) # pyright: ignore[reportOptionalSubscript] check for none is above, mappedSource and mappedTarget are safe
+    return matchByEndpoints(coll, mappedSource[0], mappedTarget[0], mapping) # pyright: ignore[reportOptionalSubscript] check for none is above, mappedSource and mappedTarget are safe
@@ -11,6 +11,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     Fault,
     Postponed,
     clone,
+    dependencies,
     doProcess,
     match,
     preprocess,
@@ -42,6 +43,10 @@ def _(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
 
     return newComp
 
+@dependencies.register
+def _(x: T):
+    return (x.target,)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -19,12 +19,18 @@ from arcadiaMergeTool.merger.processors._processor import (
     Continue,
     Fault,
     Postponed,
+    ProcessingPhase,
     clone,
+    dependencies,
     match,
+    phase,
     preprocess,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    exchangeIndex,
+    getDestParent,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 from . import allocation, realization
@@ -59,27 +65,30 @@ def _(x: T,
         lst.append(srcExchMappedExch)
         return lst
 
-    for tgtExch in coll:
-        # NOTE: weak match against exchange name
-        # TODO: replace weak match with PVMT based strong match
-        if tgtExch.name == x.name:
-            # for case of name we have to do complex check
-            # 1. there might be several exchanges with the same name
-            # 2. exchange is mapped before Comp and may have empty source and target
-
-            if tgtExch.source is None and tgtExch.target is None:
-                # when one of ports is not mapped, don't create twins in same collection
-                # otherwise it will not be possible to distict one exchange from another
-                # we might be facing potentinal twin exchange, but need to postpone processing
-                # True means that exchange processing must be postponed
-                return Postponed
-
-            if (tgtExch.source is not None and tgtExch.source.parent == mappedSourceFuncEntry) and (tgtExch.target is not None and tgtExch.target.parent == mappedTargetFuncEntry):
-                # if name, source function and target function are equal, map existing exchange to a candidate
-                lst.append(tgtExch)
+    # NOTE: weak match against exchange name
+    # TODO: replace weak match with PVMT based strong match
+    # for case of name we have to do complex check
+    # 1. there might be several exchanges with the same name
+    # 2. exchange is mapped before Comp and may have empty source and target
+    index = exchangeIndex(mapping)
+
+    if index.pending(coll, x.name):
+        # when one of ports is not mapped, don't create twins in same collection
+        # otherwise it will not be possible to distict one exchange from another
+        # we might be facing potentinal twin exchange, but need to postpone processing
+        # True means that exchange processing must be postponed
+        return Postponed
 
+    # if name, source function and target function are equal, map existing exchange to a candidate
     # if collection is exceeded, allow to add new exchange
-    return lst
+    return index.find(coll, x.name, mappedSourceFuncEntry, mappedTargetFuncEntry)
+
+@dependencies.register
+def _(x: T):
+    return (
+        x.source.parent if x.source is not None else None,
+        x.target.parent if x.target is not None else None,
+    )
 
 @preprocess.register
 def _(x: T,
@@ -119,6 +128,10 @@ def _(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
 
     return newComp
 
+@phase.register
+def _(_x: T):
+    return ProcessingPhase.Relations
+
 @process.register
 def _(
     x: T,
@@ -19,13 +19,19 @@ from arcadiaMergeTool.merger.processors._processor import (
     Continue,
     Fault,
     Postponed,
+    ProcessingPhase,
     clone,
+    dependencies,
     doProcess,
     match,
+    phase,
     preprocess,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    exchangeIndex,
+    getDestParent,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 from . import category
@@ -59,31 +65,23 @@ def _(x: T,
         lst.append(srcExchMappedExch)
         return lst
 
-    for tgtExch in coll:
-
-        # NOTE: weak match against physical link name
-        # TODO: replace weak match with PVMT based strong match
-        if tgtExch.name == x.name:
-            # for case of name we have to do complex check
-            # 1. there might be several physical links with the same name
-            # 2. physical link is mapped before Comp and may have empty source and target
-
-            if tgtExch.source is None or tgtExch.target is None:
-                # when one of ports is not mapped, don't create twins in same collection
-                # otherwise it will not be possible to distict one physical link from another
-                # we might be facing potentinal twin physical link, but need to postpone processing
-                # True means that physical link processing must be postponed
-                return Postponed
-
-            tgtExchMappedSourceFunc = mapping.get((tgtExch._model.uuid, tgtExch.source.parent.uuid)) # pyright: ignore[reportAttributeAccessIssue] expect uuid is there
-            tgtExchMappedTargetFunc = mapping.get((tgtExch._model.uuid, tgtExch.target.parent.uuid)) # pyright: ignore[reportAttributeAccessIssue] expect uuid is there
-
-            if tgtExchMappedSourceFunc is not None and tgtExchMappedTargetFunc is not None and tgtExchMappedSourceFunc == mappedSourceFuncEntry and tgtExchMappedTargetFunc == mappedTargetFuncEntry:
-                # if name, source function and target function are equal, map existing physical link to a candidate
-                lst.append(tgtExch)
+    # NOTE: weak match against physical link name
+    # TODO: replace weak match with PVMT based strong match
+    # for case of name we have to do complex check
+    # 1. there might be several physical links with the same name
+    # 2. physical link is mapped before Comp and may have empty source and target
+    index = exchangeIndex(mapping, anyEndPending = True)
+
+    if index.pending(coll, x.name):
+        # when one of ports is not mapped, don't create twins in same collection
+        # otherwise it will not be possible to distict one physical link from another
+        # we might be facing potentinal twin physical link, but need to postpone processing
+        # True means that physical link processing must be postponed
+        return Postponed
 
+    # if name, source component and target component are equal, map existing physical link to a candidate
     # if collection is exceeded, allow to add new physical link
-    return lst
+    return index.find(coll, x.name, mappedSourceFuncEntry, mappedTargetFuncEntry)
 
 @clone.register
 def _(x: T, coll: m.ElementList[T], _mapping: MergerElementMappingMap):
@@ -102,6 +100,13 @@ def _(x: T, coll: m.ElementList[T], _mapping: MergerElementMappingMap):
             summary = x.summary,
         )
 
+@dependencies.register
+def _(x: T):
+    return (
+        x.source.parent if x.source is not None else None,
+        x.target.parent if x.target is not None else None,
+    )
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -121,6 +126,10 @@ def _(x: T,
     # 3. ports
     return Continue
 
+@phase.register
+def _(_x: T):
+    return ProcessingPhase.Relations
+
 @process.register
 def _(
     x: T,
@@ -22,15 +22,25 @@ import capellambse.model as m
 from capellambse import helpers
 
 from arcadiaMergeTool import getLogger
-from arcadiaMergeTool.helpers.types import MergerElementMappingMap
+from arcadiaMergeTool.helpers.types import (
+    MergerElementMappingKey,
+    MergerElementMappingMap,
+)
 from arcadiaMergeTool.merger.processors._processor import (
     Fault,
-    Postponed,
+    ProcessingPhase,
     clone,
+    dependencies,
     match,
+    phase,
+    postponeUntil,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    portIndex,
+    recordConnected,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -40,7 +50,7 @@ U = mm.cs.PhysicalLink
 V = mm.cs.Component
 W = mm.cs.AbstractPhysicalLinkEnd
 
-def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V, source: bool, srcExch: U | None = None)-> T | None:
+def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V, source: bool, mapping: MergerElementMappingMap, srcExch: U | None = None)-> T | None:
     """Find port based on exchange props.
 
     Parameters
@@ -53,6 +63,8 @@ def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V,
         destination parent to check
     source:
         Flag for checking source or target end of link
+    mapping:
+        Cache holding the port index
     srcExch:
         Exchange to match against
 
@@ -60,24 +72,19 @@ def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V,
     -------
     Matching port or None
     """
+    index = portIndex(mapping, "links")
     if srcExch is None:
-        for port in targetCollection:
-            if len(port.links) == 0 and port.name == x.name:
-                return port
-    else:
-        for port in targetCollection:
-            for ex in port.links:
-                # NOTE: weak match against exchange name
-                # TODO: replace weak match with PVMT based strong match
-                if (ex.name == srcExch.name
-                    or (source and ex.source is not None and ex.source.name == x.name)
-                    or (not source and ex.target is not None and ex.target.name == x.name)):
-                    return port
+        return index.findUnconnected(targetCollection, x.name) # pyright: ignore[reportReturnType] expect collection holds ports
 
-    return None
+    # NOTE: weak match against exchange name
+    # TODO: replace weak match with PVMT based strong match
+    return index.findConnected(targetCollection, srcExch.name, # pyright: ignore[reportReturnType] expect collection holds ports
+        sourceName = x.name if source else None,
+        targetName = None if source else x.name,
+    )
 
 @clone.register
-def __createCompoentPort(x: T, targetCollection: m.ElementList[T], _mapping: MergerElementMappingMap) -> T:
+def __createCompoentPort(x: T, targetCollection: m.ElementList[T], mapping: MergerElementMappingMap) -> T:
     LOGGER.debug(
         "[%s] Create a non-library Physical Port name [%s], uuid [%s], model name [%s], uuid [%s]",
         clone.__qualname__,
@@ -87,7 +94,7 @@ def __createCompoentPort(x: T, targetCollection: m.ElementList[T], _mapping: Mer
         x._model.uuid,
     )
 
-    return targetCollection.create(helpers.xtype_of(x._element),
+    port = targetCollection.create(helpers.xtype_of(x._element),
         aggregation_kind = x.aggregation_kind,
         description = x.description,
         is_abstract = x.is_abstract,
@@ -109,6 +116,22 @@ def __createCompoentPort(x: T, targetCollection: m.ElementList[T], _mapping: Mer
         visibility = x.visibility,
     )
 
+    # ports are cloned by the matcher, not by the merge loop
+    portIndex(mapping, "links").add(targetCollection, port)
+
+    return port
+
+@dependencies.register
+def _(x: T):
+    # port is mapped by links, see module description
+    return tuple(x.links)
+
+@phase.register
+def _(_x: T):
+    # port follows its links by dependencies and lands right after them,
+    # next links with the same name rely on mapped ports to detect twins
+    return ProcessingPhase.Elements
+
 @process.register
 def _(
     x: T,
@@ -137,6 +160,7 @@ def _(x: T,
 ):
     portCandidates: dict[str, W] = {}
     postpone = False
+    pending: list[MergerElementMappingKey] = []
     newPort = None
     for ex in x.links:
         LOGGER.debug("[%s] processing physical link name [%s], uuid [%s], class [%s], port name [%s], uuid [%s], class [%s], model name%s], uuid [%s]",
@@ -163,6 +187,7 @@ def _(x: T,
                 x._model.uuid,
             )
             postpone = True
+            pending.append((ex._model.uuid, ex.uuid))
             continue
 
         mappedLink: U = exMap[0] # pyright: ignore[reportAssignmentType] expect physical link is correct type
@@ -172,15 +197,17 @@ def _(x: T,
             if mappedLink.source is None:
                 # potential superset case - link exists, but not mapped
                 # find first matching port with link sharing same properties
-                port= __findMatchingPort(x, coll, destParent, True,  ex)
+                port= __findMatchingPort(x, coll, destParent, True, mapping, ex)
                 if port is not  None:
                     portCandidates[port.uuid] = port
                     mappedLink.source = port
+                    recordConnected(mappedLink, mapping)
                 else:
                     # port was not mapped, add port to the collection
                     newPort = __createCompoentPort(x, coll, mapping)
                     portCandidates[newPort.uuid] = newPort
                     mappedLink.source = newPort
+                    recordConnected(mappedLink, mapping)
                     mapping[(x._model.uuid, x.uuid)] = (newPort, False)
             else:
                 portCandidates[mappedLink.source.uuid] = mappedLink.source
@@ -203,19 +230,23 @@ def _(x: T,
                         x._model.uuid,
                     )
                     postpone = True
+                    if ex.source is not None:
+                        pending.append((ex._model.uuid, ex.source.uuid))
                     continue
 
                 # potential superset case - link exists, but not mapped
                 # find first matching port with link sharing same properties
-                port = __findMatchingPort(x, coll, destParent, False, ex)
+                port = __findMatchingPort(x, coll, destParent, False, mapping, ex)
                 if port is not None:
                     portCandidates[port.uuid] = port
                     mappedLink.target = port
+                    recordConnected(mappedLink, mapping)
                 else:
                     # port was not mapped, add port to the collection
                     newPort = __createCompoentPort(x, coll, mapping)
                     portCandidates[newPort.uuid] = newPort
                     mappedLink.target = newPort
+                    recordConnected(mappedLink, mapping)
                     mapping[(x._model.uuid, x.uuid)] = (newPort, False)
             else:
                 portCandidates[mappedLink.target.uuid] = mappedLink.target
@@ -224,11 +255,11 @@ def _(x: T,
         if newPort is not None:
             # if new port was created, record it in the mapping to avoid duplication
             mapping[(x._model.uuid, x.uuid)] = (newPort, False)
-        return Postponed
+        return postponeUntil(mapping, *pending)
 
     if len(portCandidates) == 0:
         # port without exchanges
-        port = __findMatchingPort(x, coll, destParent, False)
+        port = __findMatchingPort(x, coll, destParent, False, mapping)
         if port is None:
             port = __createCompoentPort(x, coll, mapping)
         mapping[(x._model.uuid, x.uuid)] = (port, False)
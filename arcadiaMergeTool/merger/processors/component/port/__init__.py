@@ -22,15 +22,25 @@ import capellambse.model as m
 from capellambse import helpers
 
 from arcadiaMergeTool import getLogger
-from arcadiaMergeTool.helpers.types import MergerElementMappingMap
+from arcadiaMergeTool.helpers.types import (
+    MergerElementMappingKey,
+    MergerElementMappingMap,
+)
 from arcadiaMergeTool.merger.processors._processor import (
     Fault,
-    Postponed,
+    ProcessingPhase,
     clone,
+    dependencies,
     match,
+    phase,
+    postponeUntil,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    portIndex,
+    recordConnected,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 from . import allocation
@@ -46,7 +56,7 @@ U = mm.fa.ComponentExchange
 V = mm.cs.Component
 W = mm.modellingcore.InformationsExchanger
 
-def __findMatchingPort(x: T, targetCollection: m.ElementList[T], destParent: V, source: bool, srcExch: U | None = None)-> T | None:
+def __findMatchingPort(x: T, targetCollection: m.ElementList[T], destParent: V, source: bool, mapping: MergerElementMappingMap, srcExch: U | None = None)-> T | None:
     """Find port based on exchange props.
 
     Parameters
@@ -59,6 +69,8 @@ def __findMatchingPort(x: T, targetCollection: m.ElementList[T], destParent: V,
         destination parent to check
     source:
         Flag for checking source or target end of link
+    mapping:
+        Cache holding the port index
     srcExch:
         Exchange to match against
 
@@ -66,25 +78,21 @@ def __findMatchingPort(x: T, targetCollection: m.ElementList[T], destParent: V,
     -------
     Matching port or None
     """
+    index = portIndex(mapping)
     if srcExch is None:
-        for port in targetCollection:
-            if len(port.exchanges) == 0 and port.name == x.name:
-                return port
-    else:
-        for port in targetCollection:
-            for ex in port.exchanges:
-                # NOTE: weak match against exchange name
-                # TODO: replace weak match with PVMT based strong match
-                # if ((ex.name == srcExch.name and port.parent == destParent and x.orientation == port.orientation)
-                #     or (source and ex.source is not None and ex.source.name == x.name)
-                #     or (not source and ex.target is not None and ex.target.name == x.name)):
-                if ex.name == srcExch.name and port.parent == destParent and x.orientation == port.orientation:
-                    return port
-
-    return None
+        return index.findUnconnected(targetCollection, x.name) # pyright: ignore[reportReturnType] expect collection holds ports
+
+    # NOTE: weak match against exchange name
+    # TODO: replace weak match with PVMT based strong match
+    # if ((ex.name == srcExch.name and port.parent == destParent and x.orientation == port.orientation)
+    #     or (source and ex.source is not None and ex.source.name == x.name)
+    #     or (not source and ex.target is not None and ex.target.name == x.name)):
+    return index.findConnected(targetCollection, srcExch.name, # pyright: ignore[reportReturnType] expect collection holds ports
+        accept = lambda port: port.parent == destParent and x.orientation == port.orientation,
+    )
 
 @clone.register
-def __createCompoentPort(x: T, targetCollection: m.ElementList[T], _mapping: MergerElementMappingMap) -> T:
+def __createCompoentPort(x: T, targetCollection: m.ElementList[T], mapping: MergerElementMappingMap) -> T:
     LOGGER.debug(
         f"[{clone.__qualname__}] Create a non-library Component Port name [%s], uuid [%s], model name [%s], uuid [%s]",
         x.name,
@@ -92,7 +100,7 @@ def __createCompoentPort(x: T, targetCollection: m.ElementList[T], _mapping: Mer
         x._model.name,
         x._model.uuid,
     )
-    return targetCollection.create(helpers.xtype_of(x._element),
+    port = targetCollection.create(helpers.xtype_of(x._element),
         aggregation_kind = x.aggregation_kind,
         description = x.description,
         is_abstract = x.is_abstract,
@@ -116,6 +124,22 @@ def __createCompoentPort(x: T, targetCollection: m.ElementList[T], _mapping: Mer
         visibility = x.visibility,
     )
 
+    # ports are cloned by the matcher, not by the merge loop
+    portIndex(mapping).add(targetCollection, port)
+
+    return port
+
+
+@dependencies.register
+def _(x: T):
+    # port is mapped by exchanges, see module description
+    return tuple(x.exchanges)
+
+@phase.register
+def _(_x: T):
+    # port follows its exchanges by dependencies and lands right after them,
+    # next exchanges with the same name rely on mapped ports to detect twins
+    return ProcessingPhase.Elements
 
 @process.register
 def _(
@@ -145,6 +169,7 @@ def _(x: T,
 ):
     portCandidates: dict[str, W] = {}
     postpone = False
+    pending: list[MergerElementMappingKey] = []
     newPort = None
     for ex in x.exchanges:
         exMap = mapping.get((ex._model.uuid, ex.uuid))
@@ -159,6 +184,7 @@ def _(x: T,
                 x._model.uuid,
             )
             postpone = True
+            pending.append((ex._model.uuid, ex.uuid))
             continue
 
         mappedEx: U = exMap[0] # pyright: ignore[reportAssignmentType] expect it's correct type
@@ -168,15 +194,17 @@ def _(x: T,
             if mappedEx.source is None:
                 # potential superset case - exchange exists, but not mapped
                 # find first matching port with exchange sharing same properties
-                port= __findMatchingPort(x, coll, destParent, True, ex)
+                port= __findMatchingPort(x, coll, destParent, True, mapping, ex)
                 if port is not None:
                     portCandidates[port.uuid] = port
                     mappedEx.source = port
+                    recordConnected(mappedEx, mapping)
                 else:
                     # port was not mapped, add port to the collection
                     newPort = __createCompoentPort(x, coll, mapping)
                     portCandidates[newPort.uuid] = newPort
                     mappedEx.source = newPort
+                    recordConnected(mappedEx, mapping)
                     mapping[(x._model.uuid, x.uuid)] = (newPort, False)
             else:
                 portCandidates[mappedEx.source.uuid] = mappedEx.source
@@ -186,15 +214,17 @@ def _(x: T,
             if mappedEx.target is None:
                 # potential superset case - exchange exists, but not mapped
                 # find first matching port with exchange sharing same properties
-                port = __findMatchingPort(x, coll, destParent, False, ex)
+                port = __findMatchingPort(x, coll, destParent, False, mapping, ex)
                 if port is not None:
                     portCandidates[port.uuid] = port
                     mappedEx.target = port
+                    recordConnected(mappedEx, mapping)
                 else:
                     # port was not mapped, add port to the collection
                     newPort = __createCompoentPort(x, coll, mapping)
                     portCandidates[newPort.uuid] = newPort
                     mappedEx.target = newPort
+                    recordConnected(mappedEx, mapping)
                     mapping[(x._model.uuid, x.uuid)] = (newPort, False)
             else:
                 portCandidates[mappedEx.target.uuid] = mappedEx.target
@@ -203,11 +233,11 @@ def _(x: T,
         if newPort is not None:
             # if new port was created, record it in the mapping to avoid duplication
             mapping[(x._model.uuid, x.uuid)] = (newPort, False)
-        return Postponed
+        return postponeUntil(mapping, *pending)
 
     if len(portCandidates) == 0:
         # port without exchanges
-        port = __findMatchingPort(x, coll, destParent, False)
+        port = __findMatchingPort(x, coll, destParent, False, mapping)
         if port is None:
             port = __createCompoentPort(x, coll, mapping)
         mapping[(x._model.uuid, x.uuid)] = (port, False)
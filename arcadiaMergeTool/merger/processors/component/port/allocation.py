@@ -13,7 +13,10 @@ from arcadiaMergeTool.merger.processors._processor import (
     match,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    matchByEndpoints,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -65,4 +68,4 @@ def _(x: T,
         # if source or target is not mapped, postpone allocation processing
         return Postponed
 
-    return list(filter(lambda y: y.source == mappedSource[0] and y.target == mappedTarget[0], coll)) # pyright: ignore[reportOptionalSubscript] check for none is above, mappedSource and mappedTarget are safe
+    return matchByEndpoints(coll, mappedSource[0], mappedTarget[0], mapping) # pyright: ignore[reportOptionalSubscript] check for none is above, mappedSource and mappedTarget are safe
@@ -22,15 +22,25 @@ import capellambse.model as m
 from capellambse import helpers
 
 from arcadiaMergeTool import getLogger
-from arcadiaMergeTool.helpers.types import MergerElementMappingMap
+from arcadiaMergeTool.helpers.types import (
+    MergerElementMappingKey,
+    MergerElementMappingMap,
+)
 from arcadiaMergeTool.merger.processors._processor import (
     Fault,
-    Postponed,
+    ProcessingPhase,
     clone,
+    dependencies,
     match,
+    phase,
+    postponeUntil,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    portIndex,
+    recordConnected,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -40,7 +50,7 @@ U = mm.fa.FunctionalExchange
 V = mm.fa.AbstractFunction
 W = mm.activity.ActivityNode
 
-def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V, source: bool, srcExch: U | None = None)-> T | None:
+def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V, source: bool, mapping: MergerElementMappingMap, srcExch: U | None = None)-> T | None:
     """Find port based on exchange props.
 
     Parameters
@@ -53,6 +63,8 @@ def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V,
         destination parent to check
     source:
         Flag for checking source or target end of link
+    mapping:
+        Cache holding the port index
     srcExch:
         Exchange to match against
 
@@ -60,24 +72,19 @@ def __findMatchingPort(x: T, targetCollection: m.ElementList[T], _destParent: V,
     -------
     Matching port or None
     """
+    index = portIndex(mapping)
     if srcExch is None:
-        for port in targetCollection:
-            if len(port.exchanges) == 0 and port.name == x.name:
-                return port
-    else:
-        for port in targetCollection:
-            for ex in port.exchanges:
-                # NOTE: weak match against exchange name
-                # TODO: replace weak match with PVMT based strong match
-                if (ex.name == srcExch.name
-                    or (source and ex.source is not None and ex.source.name == x.name)
-                    or (not source and ex.target is not None and ex.target.name == x.name)):
-                    return port
+        return index.findUnconnected(targetCollection, x.name) # pyright: ignore[reportReturnType] expect collection holds ports
 
-    return None
+    # NOTE: weak match against exchange name
+    # TODO: replace weak match with PVMT based strong match
+    return index.findConnected(targetCollection, srcExch.name, # pyright: ignore[reportReturnType] expect collection holds ports
+        sourceName = x.name if source else None,
+        targetName = None if source else x.name,
+    )
 
 @clone.register
-def __createCompoentPort(x: T, coll: m.ElementList[T], _mapping: MergerElementMappingMap):
+def __createCompoentPort(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
     LOGGER.debug(
         f"[{process.__qualname__}] Create Function Port name [%s], uuid [%s], model name [%s], uuid [%s]",
         x.name,
@@ -103,8 +110,22 @@ def __createCompoentPort(x: T, coll: m.ElementList[T], _mapping: MergerElementMa
     if x.represented_component_port is not None:
         newComp.represented_component_port = x.represented_component_port
 
+    # ports are cloned by the matcher, not by the merge loop
+    portIndex(mapping).add(coll, newComp)
+
     return newComp
 
+@dependencies.register
+def _(x: T):
+    # port is mapped by exchanges, see module description
+    return tuple(x.exchanges)
+
+@phase.register
+def _(_x: T):
+    # port follows its exchanges by dependencies and lands right after them,
+    # next exchanges with the same name rely on mapped ports to detect twins
+    return ProcessingPhase.Elements
+
 @process.register
 def _(
     x: T,
@@ -138,6 +159,7 @@ def _(x: T,
 ):
     portCandidates: dict[str, T | W] = {}
     postpone = False
+    pending: list[MergerElementMappingKey] = []
     newPort = None
     for ex in x.exchanges:
         exMap = mapping.get((ex._model.uuid, ex.uuid))
@@ -153,6 +175,7 @@ def _(x: T,
             # keep port in queue if any single exchange is not mapped
             # but keep returning to proceed with updated exchanges
             postpone = True
+            pending.append((ex._model.uuid, ex.uuid))
             continue
 
         mappedEx: U = exMap[0] # pyright: ignore[reportAssignmentType] expect exchange is correct type
@@ -162,15 +185,17 @@ def _(x: T,
             if mappedEx.source is None:
                 # potential superset case - exchange exists, but not mapped
                 # find first matching port with exchange sharing same properties
-                port= __findMatchingPort(x, coll, destParent, True, ex)
+                port= __findMatchingPort(x, coll, destParent, True, mapping, ex)
                 if port is not None:
                     portCandidates[port.uuid] = port
                     mappedEx.source = port
+                    recordConnected(mappedEx, mapping)
                 else:
                     # port was not mapped, add port to the collection
                     newPort = __createCompoentPort(x, coll, mapping)
                     portCandidates[newPort.uuid] = newPort
                     mappedEx.source = newPort
+                    recordConnected(mappedEx, mapping)
                     mapping[(x._model.uuid, x.uuid)] = (newPort, False)
             else:
                 portCandidates[mappedEx.source.uuid] = mappedEx.source
@@ -180,15 +205,17 @@ def _(x: T,
             if mappedEx.target is None:
                 # potential superset case - exchange exists, but not mapped
                 # find first matching port with exchange sharing same properties
-                port= __findMatchingPort(x, coll, destParent, True, ex)
+                port= __findMatchingPort(x, coll, destParent, True, mapping, ex)
                 if port is not None:
                     portCandidates[port.uuid] = port
                     mappedEx.target = port
+                    recordConnected(mappedEx, mapping)
                 else:
                     # port was not mapped, add port to the collection
                     newPort = __createCompoentPort(x, coll, mapping)
                     portCandidates[newPort.uuid] = newPort
                     mappedEx.target = newPort
+                    recordConnected(mappedEx, mapping)
                     mapping[(x._model.uuid, x.uuid)] = (newPort, False)
             else:
                 portCandidates[mappedEx.target.uuid] = mappedEx.target
@@ -196,11 +223,11 @@ def _(x: T,
         if newPort is not None:
             # if new port was created, record it in the mapping to avoid duplication
             mapping[(x._model.uuid, x.uuid)] = (newPort, False)
-        return Postponed
+        return postponeUntil(mapping, *pending)
 
     if len(portCandidates) == 0:
         # port without exchanges
-        port = __findMatchingPort(x, coll, destParent, False)
+        port = __findMatchingPort(x, coll, destParent, False, mapping)
         if port is None:
             port = __createCompoentPort(x, coll, mapping)
         mapping[(x._model.uuid, x.uuid)] = (port, False)
@@ -16,7 +16,10 @@ from arcadiaMergeTool.merger.processors._processor import (
     preprocess,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    matchByEndpoints,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -83,7 +86,7 @@ def _(x: T,
         # if source or target is not mapped, postpone allocation processing
         return Postponed
 
-    lst = list(filter(lambda y: y.source == mappedSource[0] and y.target == mappedTarget[0], coll)) # pyright: ignore[reportOptionalSubscript] check for none is above, mappedSource and mappedTarget are safe
+    lst = matchByEndpoints(coll, mappedSource[0], mappedTarget[0], mapping) # pyright: ignore[reportOptionalSubscript] check for none is above, mappedSource and mappedTarget are safe
 
     LOGGER.debug("[%s] Component matches, uuid [%s], class [%s], source name [%s], uuid [%s], class [%s], target name [%s], uuid [%s], class [%s], model name [%s], uuid [%s], list [%s]",
         match.__qualname__,
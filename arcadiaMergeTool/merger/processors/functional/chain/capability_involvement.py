@@ -16,7 +16,10 @@ from arcadiaMergeTool.merger.processors._processor import (
     preprocess,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    matchByEndpoints,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -80,4 +83,4 @@ def _(x: T,
         # if source or target is not mapped, postpone allocation processing
         return Postponed
 
-    return list(filter(lambda y: y.parent == mappedSource[0] and y.involved == mappedTarget[0], coll))
+    return matchByEndpoints(coll, mappedSource[0], mappedTarget[0], mapping, "parent", "involved")
@@ -23,9 +23,12 @@ from arcadiaMergeTool.merger.processors._processor import (
     Continue,
     Fault,
     Postponed,
+    ProcessingPhase,
     clone,
+    dependencies,
     doProcess,
     match,
+    phase,
     preprocess,
     process,
 )
@@ -110,6 +113,10 @@ def _(x: T, coll: m.ElementList[T], _mapping: MergerElementMappingMap):
 
     return newComp
 
+@dependencies.register
+def _(x: T):
+    return (x.source, x.target)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -133,6 +140,10 @@ def _(x: T,
         return Postponed
     return Continue
 
+@phase.register
+def _(_x: T):
+    return ProcessingPhase.Relations
+
 @process.register
 def _(
     x: T,
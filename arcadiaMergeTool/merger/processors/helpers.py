@@ -4,6 +4,8 @@ import capellambse.model as m
 
 from arcadiaMergeTool import getLogger
 from arcadiaMergeTool.helpers import ExitCodes
+from arcadiaMergeTool.helpers.index import AdjacencyIndex, ExchangeIndex
+from arcadiaMergeTool.helpers.mapping import MergerElementMapping
 from arcadiaMergeTool.helpers.types import MergerElementMappingMap
 
 LOGGER = getLogger(__name__)
@@ -26,3 +28,121 @@ def getDestParent(x: m.ModelElement, mapping: MergerElementMappingMap):
         sys.exit(str(ExitCodes.MergeFault))
 
     return destParentEntry[0]
+
+def matchByName(x: m.ModelElement, coll: m.ElementList, mapping: MergerElementMappingMap) -> list:
+    """Find collection elements with the same name.
+
+    Parameters
+    ----------
+    x:
+        Source element to match
+    coll:
+        Destination collection to search in
+    mapping:
+        Cache holding the name index
+
+    Returns
+    -------
+    Elements with the name of source element in collection order
+    """
+    if isinstance(mapping, MergerElementMapping):
+        return mapping.names.find(coll, x.name)
+
+    return list(filter(lambda y: y.name == x.name, coll))
+
+def matchByEndpoints(
+    coll: m.ElementList,
+    source: m.ModelElement,
+    target: m.ModelElement,
+    mapping: MergerElementMappingMap,
+    sourceAttr: str = "source",
+    targetAttr: str = "target",
+) -> list:
+    """Find collection relationships with the same ends.
+
+    Parameters
+    ----------
+    coll:
+        Destination collection to search in
+    source:
+        Destination source element
+    target:
+        Destination target element
+    mapping:
+        Cache holding the endpoint index
+    sourceAttr:
+        Attribute holding relationship source
+    targetAttr:
+        Attribute holding relationship target
+
+    Returns
+    -------
+    Relationships between source and target in collection order
+    """
+    if isinstance(mapping, MergerElementMapping):
+        return mapping.endpoints(sourceAttr, targetAttr).find(coll, (source.uuid, target.uuid))
+
+    return list(filter(lambda y: getattr(y, sourceAttr) == source and getattr(y, targetAttr) == target, coll))
+
+def portIndex(mapping: MergerElementMappingMap, exchangesAttr: str = "exchanges") -> AdjacencyIndex:
+    """Get index of destination ports by connected exchanges.
+
+    Parameters
+    ----------
+    mapping:
+        Cache holding the port index
+    exchangesAttr:
+        Port attribute holding connected exchanges
+
+    Returns
+    -------
+    Index kept by the cache, or throwaway index for plain mappings
+    """
+    if isinstance(mapping, MergerElementMapping):
+        return mapping.adjacency(exchangesAttr)
+
+    return AdjacencyIndex(exchangesAttr)
+
+def exchangeIndex(
+    mapping: MergerElementMappingMap,
+    sourceAttr: str = "source",
+    targetAttr: str = "target",
+    anyEndPending: bool = False,
+    endNamed: bool = False,
+) -> ExchangeIndex:
+    """Get index of destination exchanges by name and owners of their ends.
+
+    Parameters
+    ----------
+    mapping:
+        Cache holding the exchange index
+    sourceAttr:
+        Attribute holding exchange source end
+    targetAttr:
+        Attribute holding exchange target end
+    anyEndPending:
+        Exchange missing any of its ends is pending
+    endNamed:
+        Exchange is named after its source end
+
+    Returns
+    -------
+    Index kept by the cache, or throwaway index for plain mappings
+    """
+    if isinstance(mapping, MergerElementMapping):
+        return mapping.exchanges(sourceAttr, targetAttr, anyEndPending, endNamed)
+
+    return ExchangeIndex(sourceAttr, targetAttr, anyEndPending, endNamed)
+
+def recordConnected(ex: m.ModelElement, mapping: MergerElementMappingMap):
+    """Update cache indexes with assigned exchange end.
+
+    Parameters
+    ----------
+    ex:
+        Exchange with the new end
+    mapping:
+        Cache holding the indexes
+    """
+    if isinstance(mapping, MergerElementMapping):
+        mapping.recordConnected(ex)
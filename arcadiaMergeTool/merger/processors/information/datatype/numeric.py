@@ -10,14 +10,20 @@ from arcadiaMergeTool.helpers.types import MergerElementMappingMap
 from arcadiaMergeTool.merger.processors._processor import (
     Continue,
     Fault,
+    MatchKey,
     Postponed,
     clone,
+    dependencies,
     doProcess,
     match,
+    matchKey,
     preprocess,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    getDestParent,
+    matchByName,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -48,6 +54,10 @@ def _(x: T, coll: m.ElementList[T], _mapping: MergerElementMappingMap):
 
     return newComp
 
+@dependencies.register
+def _(x: T):
+    return (x.super,)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -83,8 +93,12 @@ def _(
 def _(x: T,
     _destParent: m.ModelElement,
     coll: m.ElementList[T],
-    _mapping: MergerElementMappingMap
+    mapping: MergerElementMappingMap
 ):
     # use weak match by name
     # TODO: implement strong match by PVMT properties
-    return list(filter(lambda y: y.name == x.name, coll))
+    return matchByName(x, coll, mapping)
+
+@matchKey.register
+def _(_x: T):
+    return MatchKey.Name
@@ -15,6 +15,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     Postponed,
     Processed,
     clone,
+    dependencies,
     doProcess,
     match,
     preprocess,
@@ -63,6 +64,10 @@ def _(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
 
     return newComp
 
+@dependencies.register
+def _(x: T):
+    return (x.unit,)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -12,6 +12,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     Fault,
     Postponed,
     Processed,
+    dependencies,
     doProcess,
     preprocess,
     process,
@@ -23,6 +24,10 @@ LOGGER = getLogger(__name__)
 
 T = dv.BinaryExpression
 
+@dependencies.register
+def _(x: T):
+    return (x.unit,)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
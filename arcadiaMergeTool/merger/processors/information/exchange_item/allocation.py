@@ -11,6 +11,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     Fault,
     Postponed,
     clone,
+    dependencies,
     doProcess,
     match,
     preprocess,
@@ -39,6 +40,10 @@ def _(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
 
     return newComp
 
+@dependencies.register
+def _(x: T):
+    return (x.allocated_item,)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -22,13 +22,19 @@ from arcadiaMergeTool.merger.processors._processor import (
     Continue,
     Fault,
     Postponed,
+    ProcessingPhase,
     clone,
+    dependencies,
     doProcess,
     match,
+    phase,
     preprocess,
     process,
 )
-from arcadiaMergeTool.merger.processors.helpers import getDestParent
+from arcadiaMergeTool.merger.processors.helpers import (
+    exchangeIndex,
+    getDestParent,
+)
 from arcadiaMergeTool.models.capellaModel import CapellaMergeModel
 
 LOGGER = getLogger(__name__)
@@ -56,32 +62,26 @@ def _(x: T,
         lst.append(srcLinkMappedLink)
         return lst
 
-    for tgtLink in coll:
-
-        # NOTE: weak match against Part Deployment Link name
-        # TODO: replace weak match with PVMT based strong match
-        if (x.deployed_element is not None and tgtLink.deployed_element is not None
-            and tgtLink.deployed_element.name == x.deployed_element.name):
-            # for case of name we have to do complex check
-            # 1. there might be several Part Deployment Links with the same name
-            # 2. Part Deployment Link is mapped before Comp and may have empty source and target
-
-            if tgtLink.deployed_element is None or tgtLink.location is None:
-                # when one of ports is not mapped, don't create twins in same collection
-                # otherwise it will not be possible to distict one Part Deployment Link from another
-                # we might be facing potentinal twin Part Deployment Link, but need to postpone processing
-                # True means that Part Deployment Link processing must be postponed
-                return Postponed
-
-            tgtLinkMappedSourceFunc = mapping.get((tgtLink._model.uuid, tgtLink.deployed_element.parent.uuid)) # pyright: ignore[reportAttributeAccessIssue] expect deployed_element is there
-            tgtLinkMappedTargetFunc = mapping.get((tgtLink._model.uuid, tgtLink.location.parent.uuid)) # pyright: ignore[reportAttributeAccessIssue] expect location is there
+    if x.deployed_element is None:
+        return lst
 
-            if tgtLinkMappedSourceFunc is not None and tgtLinkMappedTargetFunc is not None and tgtLinkMappedSourceFunc == sourcePartDeploymentLink and tgtLinkMappedTargetFunc == targetPartDeploymentLink:
-                # if name, source function and target function are equal, map existing Part Deployment Link to a candidate
-                lst.append(tgtLink)
+    # NOTE: weak match against Part Deployment Link name
+    # TODO: replace weak match with PVMT based strong match
+    # for case of name we have to do complex check
+    # 1. there might be several Part Deployment Links with the same name
+    # 2. Part Deployment Link is mapped before Comp and may have empty source and target
+    index = exchangeIndex(mapping, "deployed_element", "location", anyEndPending = True, endNamed = True)
+
+    if index.pending(coll, x.deployed_element.name):
+        # when one of ports is not mapped, don't create twins in same collection
+        # otherwise it will not be possible to distict one Part Deployment Link from another
+        # we might be facing potentinal twin Part Deployment Link, but need to postpone processing
+        # True means that Part Deployment Link processing must be postponed
+        return Postponed
 
+    # if name, source function and target function are equal, map existing Part Deployment Link to a candidate
     # if collection is exceeded, allow to add new Part Deployment Link
-    return lst
+    return index.find(coll, x.deployed_element.name, sourcePartDeploymentLink, targetPartDeploymentLink)
 
 @clone.register
 def _(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
@@ -105,6 +105,10 @@ def _(x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
         newComp.location = targetPartDeploymentLink
     return newComp
 
+@dependencies.register
+def _(x: T):
+    return (x.deployed_element, x.location)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -124,6 +128,10 @@ def _(x: T,
     # 3. ports
     return Continue
 
+@phase.register
+def _(_x: T):
+    return ProcessingPhase.Relations
+
 @process.register
 def _(
     x: T,
@@ -13,6 +13,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     Postponed,
     Processed,
     clone,
+    dependencies,
     doProcess,
     match,
     preprocess,
@@ -38,6 +39,10 @@ def _ (x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
         type = mapping[(x._model.uuid, x.type.uuid)][0] if x.type is not None else None
     )
 
+@dependencies.register
+def _(x: T):
+    return (x.source, x.target, x.type)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
@@ -12,6 +12,7 @@ from arcadiaMergeTool.merger.processors._processor import (
     Fault,
     Postponed,
     clone,
+    dependencies,
     doProcess,
     match,
     preprocess,
@@ -45,6 +46,10 @@ def _ (x: T, coll: m.ElementList[T], mapping: MergerElementMappingMap):
 
     return newComp
 
+@dependencies.register
+def _(x: T):
+    return (x.type,)
+
 @preprocess.register
 def _(x: T,
     dest: CapellaMergeModel,
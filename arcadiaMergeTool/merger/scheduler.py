@@ -0,0 +1,163 @@
+"""Order source model elements for merge.
+
+Merge of every element depends on the other elements being mapped first:
+parent, type, exchange ends, allocation ends, etc. The scheduler builds
+the dependency graph out of those relations and sorts the elements in
+topological order, so every element lands into the merge when its
+dependencies are already processed.
+
+Elements without dependency between them are ordered by the processing
+phase declared by their processors, then by document order. Elements
+forming dependency cycles are appended at the end in the same order,
+retry logic of the merge loop takes care of them.
+
+Cycle search is used by the merge loop to report elements which can not
+make any progress.
+"""
+
+import heapq
+from collections.abc import Iterable, Iterator
+
+import capellambse.model as m
+from capellambse.model import ModelElement
+from lxml import etree
+
+from arcadiaMergeTool import getLogger
+from arcadiaMergeTool.merger.processors._processor import (
+    collectDependencies,
+    handlersOf,
+)
+
+LOGGER = getLogger(__name__)
+
+def makeSchedule(elements: Iterable[ModelElement]) -> Iterator[ModelElement]:
+    """Sort elements in dependency order.
+
+    Parameters
+    ----------
+    elements:
+        Elements of the single source model in document order
+
+    Returns
+    -------
+    Generator of elements where each element follows its dependencies
+
+    Description
+    -----------
+    Elements are consumed one by one, the graph keeps their XML elements
+    only. Elements are wrapped again when they are yielded, so wrappers of
+    the whole model are not held at once.
+    """
+    model = None
+    nodes: list[etree._Element] = []
+    ranks: list[tuple[int, int]] = []
+    index: dict[str, int] = {}
+    dependencies: list[set[str]] = []
+
+    for i, x in enumerate(elements):
+        model = x._model
+        nodes.append(x._element)
+        ranks.append((handlersOf(x).phase, i))
+        index[x.uuid] = i
+        dependencies.append({y.uuid for y in collectDependencies(x)})
+
+    successors: list[list[int]] = [[] for _ in nodes]
+    indegree = [0] * len(nodes)
+
+    for i, uuids in enumerate(dependencies):
+        for uuid in uuids:
+            # dependencies outside of the list are either in libraries or filtered out
+            j = index.get(uuid)
+            if j is not None:
+                successors[j].append(i)
+                indegree[i] += 1
+    del dependencies, index
+
+    # heap drains phases in order and keeps document order within the phase
+    ready = [ranks[i] for i, d in enumerate(indegree) if d == 0]
+    heapq.heapify(ready)
+
+    scheduled = 0
+    while ready:
+        _, i = heapq.heappop(ready)
+        scheduled += 1
+        yield m.wrap_xml(model, nodes[i]) # pyright: ignore[reportArgumentType] set by the first element
+        for j in successors[i]:
+            indegree[j] -= 1
+            if indegree[j] == 0:
+                heapq.heappush(ready, ranks[j])
+
+    if scheduled < len(nodes):
+        cyclic = [i for _, i in sorted(r for r in ranks if indegree[r[1]] > 0)]
+        LOGGER.debug(
+            "[%s] dependency cycles detected, [%s] elements scheduled in phase order",
+            makeSchedule.__qualname__,
+            len(cyclic),
+        )
+        for i in cyclic:
+            yield m.wrap_xml(model, nodes[i]) # pyright: ignore[reportArgumentType] set by the first element
+
+def findCycles[K](graph: dict[K, list[K]]) -> list[list[K]]:
+    """Find dependency cycles in the graph.
+
+    Parameters
+    ----------
+    graph:
+        Adjacency lists, node to nodes it depends on
+
+    Returns
+    -------
+    Strongly connected components with more than one node or with a self
+    loop, nodes are listed in discovery order
+
+    Description
+    -----------
+    Iterative Tarjan algorithm, edges to nodes missing in the graph are ignored.
+    """
+    index: dict[K, int] = {}
+    low: dict[K, int] = {}
+    onStack: set[K] = set()
+    stack: list[K] = []
+    cycles: list[list[K]] = []
+
+    for root in graph:
+        if root in index:
+            continue
+
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        onStack.add(root)
+        work = [(root, iter(graph[root]))]
+
+        while work:
+            node, it = work[-1]
+            for nxt in it:
+                if nxt not in graph:
+                    continue
+                if nxt not in index:
+                    index[nxt] = low[nxt] = len(index)
+                    stack.append(nxt)
+                    onStack.add(nxt)
+                    work.append((nxt, iter(graph[nxt])))
+                    break
+                if nxt in onStack:
+                    low[node] = min(low[node], index[nxt])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+                if low[node] == index[node]:
+                    component: list[K] = []
+                    while True:
+                        y = stack.pop()
+                        onStack.discard(y)
+                        component.append(y)
+                        if y == node:
+                            break
+                    if len(component) > 1 or node in graph[node]:
+                        component.reverse()
+                        cycles.append(component)
+
+    return cycles
@@ -1,7 +1,16 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 import capellambse
+from capellambse.loader import exs
 
+from arcadiaMergeTool.helpers.cache import (
+    LibraryRegistry,
+    ModelFileCache,
+    modelFileCache,
+    sharedLibraries,
+)
+from arcadiaMergeTool.helpers.idcache import updateNamespaces, verifyIdCache
 from arcadiaMergeTool.models.config_project_model import ConfigProjectModel
 from arcadiaMergeTool.models.merger_config_model import MergerConfigModel
 
@@ -10,7 +19,13 @@ from arcadiaMergeTool import logger
 class CapellaMergeModel:
     config: MergerConfigModel
 
-    def __init__(self, model: ConfigProjectModel, config: MergerConfigModel):
+    def __init__(
+        self,
+        model: ConfigProjectModel,
+        config: MergerConfigModel,
+        cache: ModelFileCache | None = None,
+        libraries: LibraryRegistry | None = None,
+    ):
         logger.info(f"[CapellaMergeModel.__init__] add model {model.name}")
         self.config = config
         self.path = os.path.join(config.basePath, model.projectPath)
@@ -28,12 +43,64 @@ class CapellaMergeModel:
 
         modelRefs: dict[str, Any] = {'revision': model.gitModelAttrib} if model.gitModelAttrib is not None else {}
 
-        self.model = capellambse.MelodyModel(path=path, resources=resources, **modelRefs)
+        with modelFileCache(cache), sharedLibraries(libraries):
+            self.model = capellambse.MelodyModel(path=path, resources=resources, **modelRefs)
 
     def save(self):
         self.model.name = self.config.name
         self.model.project.model_root.name = self.config.name
 
-        self.model._loader.update_namespaces()
-        self.model._loader.idcache_rebuild()
+        # id cache is kept current during the merge, see helpers.idcache
+        updateNamespaces(self.model._loader)
+        if self.config.verifyIdCache and not verifyIdCache(self.model._loader):
+            logger.error("[CapellaMergeModel.save] id cache of the model is inconsistent, rebuilt before save")
+        if not exs.HAS_NATIVE:
+            logger.warning("[CapellaMergeModel.save] native serializer of capellambse is not available, fragments are serialized in memory before write")
         self.model.save()
+
+def loadModels(
+    models: list[ConfigProjectModel],
+    config: MergerConfigModel,
+    workers: int | None = None,
+    cache: ModelFileCache | None = None,
+    libraries: list[LibraryRegistry | None] | None = None,
+) -> list[CapellaMergeModel]:
+    """Load independent models, concurrently if asked to.
+
+    Parameters
+    ----------
+    models:
+        Configurations of the models to load
+    config:
+        Merger configuration
+    workers:
+        Number of loading threads, models are loaded one after another by default
+    cache:
+        Cache of model file indexes, None to index files on load
+    libraries:
+        Registry to share library files with for every model, None for
+        models which are modified by the merge
+
+    Returns
+    -------
+    Loaded models in the order of configurations
+
+    Description
+    -----------
+    With more than one worker models are loaded on a thread pool, lxml
+    releases the GIL while parsing files. Loaded models hold lxml trees,
+    which cannot be passed between processes. Thread safety of capellambse
+    loading and of remote file handlers is not verified, concurrent loading
+    is opt-in. Error of any model load is raised as is.
+    """
+    if workers is None:
+        workers = 1
+    if libraries is None:
+        libraries = [None] * len(models)
+
+    if workers <= 1 or len(models) <= 1:
+        return [CapellaMergeModel(model, config, cache, lib) for (model, lib) in zip(models, libraries)]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loadModels") as pool:
+        futures = [pool.submit(CapellaMergeModel, model, config, cache, lib) for (model, lib) in zip(models, libraries)]
+        return [f.result() for f in futures]
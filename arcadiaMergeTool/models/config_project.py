@@ -6,4 +6,9 @@ class ConfigProject(BaseModel):
     )
     name: str
     author: str
-    basePath: str
\ No newline at end of file
+    basePath: str
+    persistMapping: bool = False
+    incremental: bool = False
+    loadWorkers: int | None = None
+    modelCachePath: str | None = None
+    verifyIdCache: bool = False
@@ -10,5 +10,6 @@ class MergerConfigModel(BaseModel):
     basePath: str
     infoPath: str
     name: str
-    
-
+    mappingStorePath: str | None = None
+    incremental: bool = False
+    verifyIdCache: bool = False
@@ -0,0 +1,24 @@
+import pathlib
+
+import capellambse
+
+from arcadiaMergeTool.helpers.index import NameIndex
+
+EMPTY_MODEL = pathlib.Path(__file__).parents[1] / "examples" / "lib" / "emptyModel" / "emptyModel.aird"
+
+
+def test_renamed_element_is_not_found_by_old_name():
+    model = capellambse.MelodyModel(EMPTY_MODEL)
+    coll = model.sa.capability_pkg.capabilities
+    cap = coll.create(name="Cap")
+    other = coll.create(name="Other")
+    index = NameIndex()
+    assert index.find(coll, "Cap") == [cap]
+
+    cap.name = "Renamed"
+    assert index.find(coll, "Cap") == []
+    assert index.find(coll, "Renamed") == [cap]
+
+    other.name = "Cap"
+    index.invalidate(coll)
+    assert index.find(coll, "Cap") == [other]
@@ -0,0 +1,78 @@
+import pathlib
+import types
+
+import capellambse
+import pytest
+
+from arcadiaMergeTool.helpers.fingerprint import fingerprint
+from arcadiaMergeTool.helpers.mapping import MergerElementMapping
+from arcadiaMergeTool.helpers.store import MappingStoreRow
+from arcadiaMergeTool.merger.persistence import restoreMapping, retractStale
+
+EMPTY_MODEL = pathlib.Path(__file__).parents[1] / "examples" / "lib" / "emptyModel" / "emptyModel.aird"
+
+
+def loadModel():
+    # restoreMapping and retractStale use the loaded model only
+    return types.SimpleNamespace(model=capellambse.MelodyModel(EMPTY_MODEL))
+
+
+def persisted(mapping: MergerElementMapping, src) -> list[MappingStoreRow]:
+    return [row._replace(fingerprint=fingerprint(src.model._loader[row.key[1]])) for row in mapping.rows()]
+
+
+def test_matched_again_element_is_retracted_after_rename():
+    src = loadModel()
+    dest = loadModel()
+    srcCap = src.model.sa.capability_pkg.capabilities.create(name="Cap")
+    key = (src.model.uuid, srcCap.uuid)
+
+    # first run clones the capability
+    destCap = dest.model.sa.capability_pkg.capabilities.create(name="Cap")
+    mapping = MergerElementMapping()
+    mapping[key] = (destCap, False)
+    mapping.recordCreated(destCap.uuid, key)
+    rows = persisted(mapping, src)
+
+    # summary is edited, capability is matched again by name
+    srcCap.summary = "edited"
+    mapping = MergerElementMapping()
+    restoreMapping(rows, dest, [src], mapping)
+    assert key not in mapping
+    mapping[key] = (destCap, False)
+    rows = persisted(mapping, src)
+    assert rows[0].created
+
+    # rename clones the capability again, the old one is stale
+    srcCap.name = "Cap renamed"
+    mapping = MergerElementMapping()
+    restoreMapping(rows, dest, [src], mapping)
+    assert key not in mapping
+    renamed = dest.model.sa.capability_pkg.capabilities.create(name="Cap renamed")
+    mapping[key] = (renamed, False)
+    mapping.recordCreated(renamed.uuid, key)
+
+    assert retractStale(rows, dest, mapping) == 1
+    assert dest.model.sa.capability_pkg.capabilities.by_name("Cap renamed", single=False) == [renamed]
+    with pytest.raises(KeyError):
+        dest.model._loader[destCap.uuid]
+
+
+def test_dependents_of_dropped_entry_are_matched_again():
+    src = loadModel()
+    dest = loadModel()
+    srcPkg = src.model.sa.capability_pkg.packages.create(name="Pkg")
+    srcCap = srcPkg.capabilities.create(name="Cap")
+    destPkg = dest.model.sa.capability_pkg.packages.create(name="Pkg")
+    destCap = destPkg.capabilities.create(name="Cap")
+
+    mapping = MergerElementMapping()
+    mapping[(src.model.uuid, srcPkg.uuid)] = (destPkg, False)
+    mapping[(src.model.uuid, srcCap.uuid)] = (destCap, False)
+    rows = persisted(mapping, src)
+
+    # destination of the package is gone, its capability is matched again
+    rows = [row._replace(destUuid="missing") if row.key[1] == srcPkg.uuid else row for row in rows]
+    mapping = MergerElementMapping()
+    restoreMapping(rows, dest, [src], mapping)
+    assert len(mapping) == 0